@@ -8,6 +8,17 @@ import random
 import datetime
 from typing import List, Dict, Optional
 
+# Regexes used to pull the user's name out of an introduction
+NAME_PATTERNS = [
+    r'my name is (\w+)',
+    r'i am called (\w+)',
+    r'you can call me (\w+)',
+    r"i'm known as (\w+)",
+    r'call me (\w+)',
+    r'people call me (\w+)',
+    r'everyone calls me (\w+)'
+]
+
 class AdvancedRuleBasedChatbot:
     def __init__(self):
         self.user_name = None
@@ -249,17 +260,7 @@ class AdvancedRuleBasedChatbot:
 
     def extract_name(self, text: str) -> Optional[str]:
         """Extract name from user input"""
-        name_patterns = [
-            r'my name is (\w+)',
-            r'i am called (\w+)',
-            r'you can call me (\w+)',
-            r"i'm known as (\w+)",
-            r'call me (\w+)',
-            r'people call me (\w+)',
-            r'everyone calls me (\w+)'
-        ]
-        
-        for pattern in name_patterns:
+        for pattern in NAME_PATTERNS:
             match = re.search(pattern, text)
             if match:
                 return match.group(1).title()
@@ -0,0 +1,368 @@
+"""
+Active Learning from Conversation Logs
+Logs uncertain turns to disk and folds labelled ones back into the model
+"""
+
+import gzip
+import json
+import mmap
+import os
+import time
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+GZIP_MAGIC = b'\x1f\x8b\x08'
+
+
+def _inflate(data, start, end=None):
+    """Decompress one gzip member starting at start
+
+    Returns (payload, member_end, complete). An incomplete member (torn by
+    a crash) returns whatever decoded before the damage.
+    """
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    chunks = []
+    cursor = start
+    limit = len(data) if end is None else end
+    try:
+        while cursor < limit and not decompressor.eof:
+            block = data[cursor:min(cursor + 65536, limit)]
+            chunks.append(decompressor.decompress(block))
+            cursor += len(block)
+    except zlib.error:
+        return b''.join(chunks), None, False
+    if decompressor.eof:
+        return b''.join(chunks), cursor - len(decompressor.unused_data), True
+    return b''.join(chunks), None, False
+
+
+def scan_gzip_members(path):
+    """Yield (start, end, payload, complete) for every gzip member of a file
+
+    Members are decoded one by one, so a torn member (a writer that died
+    before closing it) only loses its own undecodable tail: records before
+    it and members appended after it are still read.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = data.find(GZIP_MAGIC)
+        while start != -1:
+            payload, end, complete = _inflate(data, start)
+            if complete:
+                yield start, end, payload, True
+                start = data.find(GZIP_MAGIC, end)
+                continue
+
+            # Decode only up to the next member header, so a following
+            # member is not mistaken for the torn member's continuation
+            next_start = data.find(GZIP_MAGIC, start + 1)
+            end = len(data) if next_start == -1 else next_start
+            payload, _, _ = _inflate(data, start, end)
+            yield start, end, payload, False
+            start = next_start
+
+
+def _records(payload, complete):
+    lines = payload.split(b'\n')
+    if not complete:
+        # The last line of a torn member may be cut off
+        lines = lines[:-1]
+    for line in lines:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                continue
+
+
+def read_jsonl_gz(path):
+    """Yield records from a gzip JSONL file, skipping only damaged lines"""
+    for _, _, payload, complete in scan_gzip_members(path):
+        yield from _records(payload, complete)
+
+
+def repair_jsonl_gz(path):
+    """Replace a torn trailing gzip member with a complete one
+
+    Appending after an unterminated member would leave it in the middle of
+    the file for good. Its readable records are rewritten as a new member.
+    Returns the number of records salvaged.
+    """
+    members = list(scan_gzip_members(path))
+    if not members or members[-1][3]:
+        return 0
+
+    start, _, payload, complete = members[-1]
+    salvaged = list(_records(payload, complete))
+    with open(path, 'r+b') as f:
+        f.truncate(start)
+    if salvaged:
+        with gzip.open(path, 'at', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in salvaged))
+    return len(salvaged)
+
+
+class TurnLog:
+    def __init__(self, log_dir, preprocessor, confidence_threshold=0.6, flush_every=20):
+        """
+        log_dir              -- holds turns.jsonl.gz, labels.jsonl.gz, state.json
+                                and writer.lock
+        preprocessor         -- IntentDataPreprocessor used to normalize text
+        confidence_threshold -- turns below this confidence are logged
+        flush_every          -- records buffered before a gzip sync flush
+        """
+        os.makedirs(log_dir, exist_ok=True)
+        self.turns_path = os.path.join(log_dir, 'turns.jsonl.gz')
+        self.labels_path = os.path.join(log_dir, 'labels.jsonl.gz')
+        self.state_path = os.path.join(log_dir, 'state.json')
+        self.lock_path = os.path.join(log_dir, 'writer.lock')
+        self.lock_file = None
+        self.preprocessor = preprocessor
+        self.confidence_threshold = confidence_threshold
+        self.flush_every = flush_every
+
+        self.turns_file = None
+        self.labels_file = None
+        self.unflushed = 0
+
+        self.acquire_writer_lock()
+        self.refresh()
+
+    def refresh(self):
+        """Reload what is already on disk"""
+        # Normalized texts already on disk, so each is stored once
+        self.seen = {record['normalized'] for record in read_jsonl_gz(self.turns_path)}
+        self.labels_written = sum(1 for _ in read_jsonl_gz(self.labels_path))
+        self.state = {'labels_consumed': 0}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def acquire_writer_lock(self):
+        """Become the only writer of this log; False while another process is
+
+        The lock is released when its holder closes or dies, so holding it
+        proves no live writer has a gzip member open. Only then are torn
+        members left by a crashed writer repaired. Without fcntl (Windows)
+        a live writer cannot be detected, so nothing is ever repaired.
+        """
+        if self.lock_file is not None or fcntl is None:
+            return True
+
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+
+        for path in (self.turns_path, self.labels_path):
+            repair_jsonl_gz(path)
+        return True
+
+    def _ensure_writer(self):
+        if self.lock_file is not None or fcntl is None:
+            return
+        if not self.acquire_writer_lock():
+            raise RuntimeError(f"Another process is writing to {os.path.dirname(self.lock_path)}; "
+                               "this TurnLog can only read")
+        # The previous writer may have added records since they were loaded
+        self.refresh()
+
+    def _append(self, handle_name, path, record):
+        handle = getattr(self, handle_name)
+        if handle is None:
+            # Append mode adds a new gzip member; readers see one stream
+            handle = gzip.open(path, 'at', encoding='utf-8')
+            setattr(self, handle_name, handle)
+        handle.write(json.dumps(record) + '\n')
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every:
+            self.flush()
+
+    def record(self, user_input, intent_tag, confidence, processed_input=None, fallback=False):
+        """Log a turn if it was uncertain and its normalized text is new
+
+        Returns True when the turn was written.
+        """
+        if confidence >= self.confidence_threshold and not fallback:
+            return False
+
+        if processed_input is None:
+            processed_input = self.preprocessor.preprocess_text(user_input)
+        if not processed_input:
+            return False
+        self._ensure_writer()
+        if processed_input in self.seen:
+            return False
+
+        self.seen.add(processed_input)
+        self._append('turns_file', self.turns_path, {
+            'text': user_input,
+            'normalized': processed_input,
+            'intent': intent_tag,
+            'confidence': float(confidence),
+            'fallback': bool(fallback or confidence < self.confidence_threshold),
+            'timestamp': time.time()
+        })
+        return True
+
+    def label(self, text, tag, normalized=False):
+        """Record the correct tag for a logged (or any) message
+
+        Returns False, writing nothing, for text that normalizes to nothing:
+        an empty lookup key would match every stopword-only message.
+        """
+        processed = text if normalized else self.preprocessor.preprocess_text(text)
+        if not processed:
+            return False
+        self._ensure_writer()
+        self._append('labels_file', self.labels_path, {
+            'normalized': processed,
+            'tag': tag,
+            'timestamp': time.time()
+        })
+        self.labels_written += 1
+        return True
+
+    def turns(self):
+        self.flush()
+        return read_jsonl_gz(self.turns_path)
+
+    def pending_labels(self):
+        """Labels not yet used for an update, last label per text winning"""
+        self.flush()
+        pending = {}
+        for position, record in enumerate(read_jsonl_gz(self.labels_path)):
+            if position >= self.state['labels_consumed']:
+                pending[record['normalized']] = record['tag']
+        return pending
+
+    def mark_consumed(self, persist=True):
+        """Remember that every label written so far has been applied
+
+        Without persist the position is kept in memory only, so the labels
+        are offered again after a restart.
+        """
+        self.state['labels_consumed'] = self.labels_written
+        if not persist:
+            return
+        with open(self.state_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+
+    def flush(self):
+        for handle in (self.turns_file, self.labels_file):
+            if handle is not None:
+                handle.flush()
+        self.unflushed = 0
+
+    def close(self):
+        for name in ('turns_file', 'labels_file'):
+            handle = getattr(self, name)
+            if handle is not None:
+                handle.close()
+                setattr(self, name, None)
+        self.unflushed = 0
+        if self.lock_file is not None:
+            # Closing the file releases the flock
+            self.lock_file.close()
+            self.lock_file = None
+
+
+class IncrementalUpdater:
+    def __init__(self, chatbot, turn_log, update_every=50, model_file=None):
+        """
+        chatbot      -- MLChatbot whose lookup table and model get updated
+        turn_log     -- TurnLog providing the labelled turns
+        update_every -- pending labels needed before maybe_update() runs
+        model_file   -- artifact the updated model and lookup are saved to
+                        before labels are marked consumed; without it
+                        updates live in memory and are replayed on restart
+        """
+        self.chatbot = chatbot
+        self.turn_log = turn_log
+        self.update_every = update_every
+        self.model_file = model_file
+        self.history = []
+
+    def maybe_update(self):
+        """Run an update once enough new labels have accumulated"""
+        if self.turn_log.labels_written - self.turn_log.state['labels_consumed'] >= self.update_every:
+            return self.update()
+        return None
+
+    def update(self):
+        """Apply only the labels added since the last update
+
+        Every label goes into the exact-match lookup table, so the same
+        message is answered correctly from then on. Classifiers that support
+        partial_fit (e.g. naive bayes) are also updated on the new rows;
+        their cost is proportional to the new labels, not the corpus.
+        """
+        start_time = time.time()
+        pending = self.turn_log.pending_labels()
+        if not pending:
+            return None
+
+        # Logs written before label() rejected empty text may still hold some
+        pending = {processed: tag for processed, tag in pending.items() if processed}
+        for processed, tag in pending.items():
+            self.chatbot.pattern_lookup[processed] = (tag, 1.0)
+
+        model = self.chatbot.model
+        classifier = model.named_steps['classifier']
+        partial_fit_rows = 0
+        if hasattr(classifier, 'partial_fit'):
+            known = set(classifier.classes_)
+            rows = [(text, tag) for text, tag in pending.items() if tag in known]
+            if rows:
+                texts, tags = zip(*rows)
+                X = model.named_steps['tfidf'].transform(texts)
+                classifier.partial_fit(X, list(tags))
+                partial_fit_rows = len(rows)
+
+        # Persist the updated state first: a crash in between replays the
+        # labels instead of losing them
+        if self.model_file:
+            self.chatbot.save_model(self.model_file)
+        self.turn_log.mark_consumed(persist=bool(self.model_file))
+        stats = {
+            'labels': len(pending),
+            'partial_fit_rows': partial_fit_rows,
+            'update_time': time.time() - start_time
+        }
+        self.history.append(stats)
+        print(f"Applied {stats['labels']} new labels "
+              f"({partial_fit_rows} via partial_fit) in {stats['update_time']:.3f} seconds")
+        return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    from ml_chatbot import MLChatbot
+
+    chatbot = MLChatbot(
+        intents_file='intents.json',
+        model_file='best_intent_classifier.joblib',
+        vectorizer_file='tfidf_vectorizer.joblib'
+    )
+    chatbot.turn_log = TurnLog('active_learning_log', chatbot.preprocessor)
+    updater = IncrementalUpdater(chatbot, chatbot.turn_log, update_every=1,
+                                 model_file='best_intent_classifier.joblib')
+
+    for message in ['how do I reset my password', 'what time do you open']:
+        intent_tag, confidence, processed_input = chatbot.predict_intent(message)
+        response = chatbot.get_response(intent_tag, confidence)
+        chatbot.update_context(message, intent_tag, response, confidence, processed_input)
+
+    # A reviewer labels the logged turns; the next update picks them up
+    chatbot.turn_log.label('what time do you open', 'time')
+    updater.maybe_update()
+    print(chatbot.predict_intent('what time do you open'))
+    chatbot.turn_log.close()
@@ -0,0 +1,230 @@
+"""
+Offline Batch Scoring
+Re-classifies large JSONL or CSV message files across worker processes
+
+Usage:
+    python batch_scoring.py --model best_intent_classifier.joblib \\
+        --input messages.jsonl --output scored.jsonl --workers 4
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from itertools import islice
+
+from data_preparation import IntentDataPreprocessor
+from featurizer import featurizer_for
+from serving import classify, load_artifact
+
+# Per-process state, loaded once by init_worker
+worker_state = {}
+
+
+def init_worker(model_file, intents_file=None):
+    """Load the model and normalizer once per worker process
+
+    intents_file lets model-only artifacts rebuild their lookup table.
+    """
+    preprocessor = IntentDataPreprocessor(None)
+    intents = None
+    if intents_file:
+        with open(intents_file, 'r', encoding='utf-8') as f:
+            intents = json.load(f)['intents']
+    model, pattern_lookup = load_artifact(model_file, intents, preprocessor)
+    worker_state['model'] = model
+    worker_state['pattern_lookup'] = pattern_lookup
+    worker_state['preprocessor'] = preprocessor
+    worker_state['featurizer'] = featurizer_for(model)
+
+
+def score_texts(model, pattern_lookup, preprocessor, texts, featurizer=None):
+    """Classify a batch of raw texts, as MLChatbot.predict_intents does
+
+    Returns a list of (intent_tag, confidence).
+    """
+    processed = [preprocessor.preprocess_text(text) for text in texts]
+    return [(intent_tag, float(confidence)) for intent_tag, confidence
+            in classify(model, pattern_lookup, processed, featurizer)]
+
+
+def score_batch(batch):
+    """Worker entry point: batch is a list of (index, record_id, text)"""
+    texts = [text for _, _, text in batch]
+    scored = score_texts(worker_state['model'], worker_state['pattern_lookup'],
+                         worker_state['preprocessor'], texts, worker_state['featurizer'])
+    return [
+        {'index': index, 'id': record_id, 'intent': str(tag), 'confidence': confidence}
+        for (index, record_id, _), (tag, confidence) in zip(batch, scored)
+    ]
+
+
+def detect_format(path):
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def iter_records(path, fmt, text_field, id_field=None):
+    """Stream (index, record_id, text) from a JSONL or CSV file"""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        if fmt == 'csv':
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+
+        for index, row in enumerate(rows):
+            record_id = row.get(id_field) if id_field else None
+            yield index, record_id, row.get(text_field) or ''
+
+
+def iter_batches(records, batch_size):
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def completed_records(output_path, chunk_size=1 << 20):
+    """Count complete output lines, dropping a partially written last line
+
+    Reads fixed-size chunks, so memory stays flat however large the
+    output of the interrupted run is.
+    """
+    if not os.path.exists(output_path):
+        return 0
+
+    with open(output_path, 'rb+') as f:
+        # Walk back from EOF to the last newline; anything after it is torn
+        size = f.seek(0, os.SEEK_END)
+        complete = size
+        while complete > 0:
+            start = max(0, complete - chunk_size)
+            f.seek(start)
+            newline = f.read(complete - start).rfind(b'\n')
+            if newline != -1:
+                complete = start + newline + 1
+                break
+            complete = start
+        if complete < size:
+            f.truncate(complete)
+
+        f.seek(0)
+        count = 0
+        remaining = complete
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            count += chunk.count(b'\n')
+            remaining -= len(chunk)
+    return count
+
+
+class BatchScorer:
+    def __init__(self, model_file, workers=1, batch_size=5000, report_every=10,
+                 intents_file=None):
+        """
+        workers      -- worker processes, each loading the model once
+        intents_file -- rebuilds the lookup table of model-only artifacts
+        batch_size   -- records classified per call
+        report_every -- batches between throughput reports
+        """
+        self.model_file = model_file
+        self.workers = workers
+        self.batch_size = batch_size
+        self.report_every = report_every
+        self.intents_file = intents_file
+
+    def _scored_batches(self, batches):
+        """Yield scored batches in input order"""
+        if self.workers == 1:
+            init_worker(self.model_file, self.intents_file)
+            for batch in batches:
+                yield score_batch(batch)
+            return
+
+        with multiprocessing.Pool(self.workers, initializer=init_worker,
+                                  initargs=(self.model_file, self.intents_file)) as pool:
+            # A bounded window keeps memory flat on huge inputs, unlike
+            # Pool.imap which reads ahead without limit
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.apply_async(score_batch, (batch,)))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+
+    def run(self, input_path, output_path, fmt=None, text_field='text',
+            id_field=None, resume=False):
+        """Score input_path into output_path (JSONL, one line per record)
+
+        With resume, records already present in the output are skipped, so a
+        crashed run continues where it stopped.
+        """
+        fmt = fmt or detect_format(input_path)
+        done = completed_records(output_path) if resume else 0
+        if done:
+            print(f"Resuming after {done} already scored records")
+
+        records = iter_records(input_path, fmt, text_field, id_field)
+        records = islice(records, done, None)
+
+        start_time = time.time()
+        scored = 0
+        with open(output_path, 'a' if resume else 'w', encoding='utf-8') as out:
+            for batch_number, results in enumerate(
+                    self._scored_batches(iter_batches(records, self.batch_size)), 1):
+                out.write(''.join(json.dumps(result) + '\n' for result in results))
+                out.flush()
+                scored += len(results)
+
+                if batch_number % self.report_every == 0:
+                    elapsed = time.time() - start_time
+                    print(f"  {done + scored} records scored "
+                          f"({scored / elapsed:.0f} records/sec)")
+
+        elapsed = time.time() - start_time
+        stats = {
+            'scored': scored,
+            'skipped': done,
+            'elapsed': elapsed,
+            'throughput': scored / elapsed if elapsed > 0 else 0.0
+        }
+        print(f"Scored {scored} records in {elapsed:.2f} seconds "
+              f"({stats['throughput']:.0f} records/sec)")
+        return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Batch-score messages with a trained intent model")
+    parser.add_argument('--model', required=True, help="model artifact (.joblib)")
+    parser.add_argument('--input', required=True, help="JSONL or CSV file of messages")
+    parser.add_argument('--output', required=True, help="JSONL file for the scored records")
+    parser.add_argument('--intents', help="intents JSON, to rebuild the lookup table of model-only artifacts")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="input format (default: from extension)")
+    parser.add_argument('--text-field', default='text', help="field or column holding the message")
+    parser.add_argument('--id-field', help="field or column copied to the output as 'id'")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--resume', action='store_true', help="continue an interrupted run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if os.path.exists(args.output) and not args.resume:
+        print(f"{args.output} already exists. Use --resume to continue it or remove it first.")
+        return 1
+
+    scorer = BatchScorer(args.model, workers=args.workers, batch_size=args.batch_size,
+                         intents_file=args.intents)
+    scorer.run(args.input, args.output, fmt=args.format, text_field=args.text_field,
+               id_field=args.id_field, resume=args.resume)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
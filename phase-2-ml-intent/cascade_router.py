@@ -0,0 +1,288 @@
+"""
+Cascade Router for Intent Classification
+Tries cheap phase-1 rules first, the ML classifier next and a heavier model last
+"""
+
+import os
+import re
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+# Phase 1 lives in a sibling folder that is not an importable package
+PHASE_1_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           '..', 'phase-1-rule-based', 'Examples')
+
+# Phase 1 rule intents that have a differently named phase 2 counterpart
+DEFAULT_INTENT_MAP = {
+    'farewell': 'goodbye',
+    'how_are_you': 'feelings',
+    'joke_request': 'jokes',
+    'story_request': 'stories'
+}
+
+TIERS = ['exact', 'rules', 'ml', 'escalation']
+
+
+def import_rule_bot_module():
+    """Import the phase 1 sample_bot module"""
+    if PHASE_1_DIR not in sys.path:
+        sys.path.append(PHASE_1_DIR)
+    import sample_bot
+    return sample_bot
+
+
+class CompiledRules:
+    """Phase 1 rules compiled into an exact-match table and word-bounded regexes"""
+
+    def __init__(self, rules, name_patterns=None):
+        self.exact = {}
+        self.regexes = {}
+        self.name_regexes = [re.compile(p) for p in (name_patterns or [])]
+        conflicts = set()
+
+        for intent, data in rules.items():
+            patterns = [self.normalize(p) for p in data['patterns']]
+            for pattern in patterns:
+                if self.exact.get(pattern, intent) != intent:
+                    conflicts.add(pattern)
+                self.exact[pattern] = intent
+
+            # Longest alternatives first so "hi there" wins over "hi"
+            alternatives = sorted(set(patterns), key=len, reverse=True)
+            self.regexes[intent] = re.compile(
+                r'\b(?:' + '|'.join(re.escape(p) for p in alternatives) + r')\b'
+            )
+
+        # Patterns listed under several intents are left to the later tiers
+        for pattern in conflicts:
+            del self.exact[pattern]
+
+    @staticmethod
+    def normalize(text):
+        """Lowercase, drop punctuation and collapse whitespace"""
+        text = re.sub(r"[^\w\s']", ' ', text.lower())
+        return re.sub(r'\s+', ' ', text).strip()
+
+    def lookup(self, text):
+        """Return the intent whose pattern equals the whole message, if any"""
+        return self.exact.get(self.normalize(text))
+
+    def match(self, text, min_coverage=0.5):
+        """Match the message against the compiled rules
+
+        Returns (intent, coverage) where coverage is the share of the message
+        covered by the longest matching pattern, or (None, 0.0).
+        """
+        normalized = self.normalize(text)
+        if not normalized:
+            return None, 0.0
+
+        for regex in self.name_regexes:
+            if regex.search(normalized):
+                return 'user_name', 1.0
+
+        best_intent, best_coverage = None, 0.0
+        for intent, regex in self.regexes.items():
+            for found in regex.finditer(normalized):
+                coverage = len(found.group(0)) / len(normalized)
+                if coverage > best_coverage:
+                    best_intent, best_coverage = intent, coverage
+
+        if best_coverage >= min_coverage:
+            return best_intent, best_coverage
+        return None, best_coverage
+
+
+class CascadeRouter:
+    """Route each message through increasingly expensive intent classifiers
+
+    Tiers, in order:
+      exact      -- whole message equals a phase 1 pattern (one dict lookup)
+      rules      -- compiled phase 1 regexes covering most of the message
+      ml         -- phase 2 MLChatbot.predict_intent above ml_threshold
+      escalation -- optional heavier model (e.g. phase 3) for the rest
+    """
+
+    def __init__(self, ml_bot, rule_bot=None, escalation_model=None,
+                 intent_map=None, min_rule_coverage=0.5, ml_threshold=0.6,
+                 latency_window=1000):
+        self.ml_bot = ml_bot
+        sample_bot = import_rule_bot_module()
+        self.rule_bot = rule_bot or sample_bot.AdvancedRuleBasedChatbot()
+        self.escalation_model = escalation_model
+        self.intent_map = DEFAULT_INTENT_MAP if intent_map is None else intent_map
+        self.min_rule_coverage = min_rule_coverage
+        self.ml_threshold = ml_threshold
+        self.latency_window = latency_window
+
+        self.rules = CompiledRules(self.rule_bot.rules, sample_bot.NAME_PATTERNS)
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Clear hit counters and latency samples"""
+        self.total_requests = 0
+        self.stats = {
+            tier: {
+                'attempts': 0,
+                'hits': 0,
+                'time_spent': 0.0,
+                'latencies': deque(maxlen=self.latency_window)
+            }
+            for tier in TIERS
+        }
+
+    def _record(self, tier, elapsed, hit):
+        stats = self.stats[tier]
+        stats['attempts'] += 1
+        stats['time_spent'] += elapsed
+        if hit:
+            stats['hits'] += 1
+
+    def route(self, user_input):
+        """Classify a message with the cheapest tier that is confident enough
+
+        Returns a dict with intent, confidence, the tier that answered and
+        the end-to-end latency in seconds.
+        """
+        self.total_requests += 1
+        request_start = time.perf_counter()
+
+        result = self._try_rules(user_input)
+        if result is None:
+            result = self._try_models(user_input)
+
+        latency = time.perf_counter() - request_start
+        self.stats[result['tier']]['latencies'].append(latency)
+        result['latency'] = latency
+        return result
+
+    def _accept_rule(self, rule_intent, user_input):
+        """Reject user_name hits without a name, whose reply would be an unfilled template"""
+        if rule_intent == 'user_name':
+            return self.rule_bot.extract_name(user_input.lower()) is not None
+        return rule_intent is not None
+
+    def _try_rules(self, user_input):
+        start = time.perf_counter()
+        rule_intent = self.rules.lookup(user_input)
+        if not self._accept_rule(rule_intent, user_input):
+            rule_intent = None
+        self._record('exact', time.perf_counter() - start, rule_intent is not None)
+        if rule_intent is not None:
+            return self._rule_result(rule_intent, 1.0, 'exact')
+
+        start = time.perf_counter()
+        rule_intent, coverage = self.rules.match(user_input, self.min_rule_coverage)
+        if not self._accept_rule(rule_intent, user_input):
+            rule_intent = None
+        self._record('rules', time.perf_counter() - start, rule_intent is not None)
+        if rule_intent is not None:
+            return self._rule_result(rule_intent, coverage, 'rules')
+
+        return None
+
+    def _try_models(self, user_input):
+        start = time.perf_counter()
+        intent_tag, confidence, _ = self.ml_bot.predict_intent(user_input)
+        confident = confidence >= self.ml_threshold
+        self._record('ml', time.perf_counter() - start,
+                     confident or self.escalation_model is None)
+        if confident or self.escalation_model is None:
+            return {
+                'intent': intent_tag,
+                'confidence': float(confidence),
+                'tier': 'ml',
+                'rule_intent': None
+            }
+
+        start = time.perf_counter()
+        intent_tag, confidence = self.escalation_model(user_input)
+        self._record('escalation', time.perf_counter() - start, True)
+        return {
+            'intent': intent_tag,
+            'confidence': float(confidence),
+            'tier': 'escalation',
+            'rule_intent': None
+        }
+
+    def _rule_result(self, rule_intent, confidence, tier):
+        return {
+            'intent': self.intent_map.get(rule_intent, rule_intent),
+            'confidence': confidence,
+            'tier': tier,
+            'rule_intent': rule_intent
+        }
+
+    def respond(self, user_input):
+        """Route a message and build the reply from the bot that handled it"""
+        result = self.route(user_input)
+
+        if result['rule_intent'] is not None:
+            # Phase 1 name extraction expects lowercased text
+            response = self.rule_bot.get_response(result['rule_intent'],
+                                                  user_input.lower())
+        else:
+            response = self.ml_bot.get_response(result['intent'],
+                                                result['confidence'],
+                                                self.ml_threshold)
+
+        # Only model confidences are comparable to the turn log threshold
+        model_confidence = result['confidence'] if result['rule_intent'] is None else None
+        self.ml_bot.update_context(user_input, result['intent'], response, model_confidence)
+        return response, result
+
+    def get_stats(self):
+        """Per-tier hit rates and latency, for tuning thresholds against cost"""
+        report = {'total_requests': self.total_requests, 'tiers': {}}
+
+        for tier in TIERS:
+            stats = self.stats[tier]
+            latencies = np.array(stats['latencies']) * 1000
+            tier_report = {
+                'attempts': stats['attempts'],
+                'hits': stats['hits'],
+                'hit_rate': stats['hits'] / self.total_requests if self.total_requests else 0.0,
+                'mean_tier_ms': (stats['time_spent'] / stats['attempts'] * 1000
+                                 if stats['attempts'] else 0.0)
+            }
+            if len(latencies):
+                tier_report['p50_ms'] = float(np.percentile(latencies, 50))
+                tier_report['p95_ms'] = float(np.percentile(latencies, 95))
+                tier_report['p99_ms'] = float(np.percentile(latencies, 99))
+            report['tiers'][tier] = tier_report
+
+        return report
+
+    def print_stats(self):
+        """Print a per-tier summary table"""
+        report = self.get_stats()
+        print(f"\nCascade stats over {report['total_requests']} requests:")
+        print(f"{'TIER':<12}{'HITS':>8}{'HIT RATE':>10}{'MEAN MS':>10}{'P95 MS':>10}")
+        for tier, stats in report['tiers'].items():
+            p95 = stats.get('p95_ms', 0.0)
+            print(f"{tier:<12}{stats['hits']:>8}{stats['hit_rate']:>10.2%}"
+                  f"{stats['mean_tier_ms']:>10.3f}{p95:>10.3f}")
+
+
+# Example usage
+if __name__ == "__main__":
+    from ml_chatbot import MLChatbot
+
+    chatbot = MLChatbot(
+        intents_file='intents.json',
+        model_file='best_intent_classifier.joblib',
+        vectorizer_file='tfidf_vectorizer.joblib'
+    )
+    router = CascadeRouter(chatbot)
+
+    for message in ['hi', 'My name is Ada', 'thanks a lot for that',
+                    'what can machine learning do for my business?']:
+        response, result = router.respond(message)
+        print(f"You: {message}")
+        print(f"Bot: {response}")
+        print(f"    [{result['tier']} | {result['intent']} | {result['confidence']:.2f}]")
+
+    router.print_stats()
@@ -4,6 +4,8 @@ Handles dataset loading, preprocessing, and splitting
 """
 
 import json
+from collections import Counter, defaultdict
+from functools import lru_cache
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
@@ -19,14 +21,46 @@ try:
 except LookupError:
     nltk.download('stopwords')
 
+def build_pattern_lookup(patterns, labels):
+    """Map each normalized pattern to its majority tag and confidence
+    
+    Confidence is the share of occurrences carrying the majority tag.
+    Returns (lookup, conflicts) where conflicts holds the tag counts of
+    patterns seen under more than one tag.
+    """
+    tag_counts = defaultdict(Counter)
+    for pattern, label in zip(patterns, labels):
+        # Patterns made only of stopwords carry no signal
+        if pattern:
+            tag_counts[pattern][label] += 1
+    
+    lookup = {}
+    conflicts = {}
+    for pattern, counts in tag_counts.items():
+        tag, count = counts.most_common(1)[0]
+        lookup[pattern] = (tag, count / sum(counts.values()))
+        if len(counts) > 1:
+            conflicts[pattern] = dict(counts)
+    
+    return lookup, conflicts
+
 class IntentDataPreprocessor:
-    def __init__(self, data_path):
+    def __init__(self, data_path, stem_cache_size=50000):
+        """
+        stem_cache_size -- distinct words whose stems are memoized; bounded
+                           because serving feeds arbitrary user text through
+        """
         self.data_path = data_path
         self.data = None
         self.df = None
         self.label_encoder = LabelEncoder()
         self.stemmer = PorterStemmer()
         self.stop_words = set(stopwords.words('english'))
+        # Stemming dominates preprocessing and most words repeat
+        self.stem = lru_cache(maxsize=stem_cache_size)(self.stemmer.stem)
+        self.pattern_lookup = {}
+        self.pattern_conflicts = {}
+        self.splits = {}
         
     def load_data(self):
         """Load intent data from JSON file"""
@@ -36,6 +70,10 @@ class IntentDataPreprocessor:
     
     def preprocess_text(self, text):
         """Clean and preprocess text data"""
+        return ' '.join(self.tokenize(text))
+    
+    def tokenize(self, text):
+        """Clean text and return its stemmed, stopword-free tokens"""
         # Convert to lowercase
         text = text.lower()
         
@@ -50,25 +88,35 @@ class IntentDataPreprocessor:
         tokens = [token for token in tokens if token not in self.stop_words]
         
         # Apply stemming
-        tokens = [self.stemmer.stem(token) for token in tokens]
+        tokens = [self.stem(token) for token in tokens]
         
-        return ' '.join(tokens)
+        return tokens
     
-    def create_training_data(self):
-        """Create training data from intents"""
+    def create_training_data(self, n_jobs=1, shard_size=2000):
+        """Create training data from intents
+        
+        With n_jobs other than 1, patterns are preprocessed in fixed-size
+        shards across worker processes and merged back in file order, so the
+        result is identical to the sequential run.
+        """
         if not self.data:
             self.load_data()
             
-        patterns = []
+        raw_patterns = []
         labels = []
         
         for intent in self.data['intents']:
             for pattern in intent['patterns']:
-                # Preprocess each pattern
-                processed_pattern = self.preprocess_text(pattern)
-                patterns.append(processed_pattern)
+                raw_patterns.append(pattern)
                 labels.append(intent['tag'])
         
+        # Preprocess each pattern
+        if n_jobs == 1:
+            patterns = [self.preprocess_text(pattern) for pattern in raw_patterns]
+        else:
+            from reproducibility import preprocess_parallel
+            patterns = preprocess_parallel(raw_patterns, n_jobs, shard_size)
+        
         # Create DataFrame
         self.df = pd.DataFrame({
             'text': patterns,
@@ -78,20 +126,52 @@ class IntentDataPreprocessor:
         # Encode labels
         encoded_labels = self.label_encoder.fit_transform(labels)
         
+        # Cached splits belong to the previous DataFrame
+        self.splits = {}
+        
+        # Exact-match table consulted before the classifier
+        self.build_pattern_lookup(patterns, labels)
+        
         return patterns, encoded_labels
     
+    def build_pattern_lookup(self, patterns, labels):
+        """Build and store the exact-match table for the given patterns"""
+        self.pattern_lookup, self.pattern_conflicts = build_pattern_lookup(patterns, labels)
+        return self.pattern_lookup
+    
+    def report_pattern_conflicts(self):
+        """Print normalized patterns that map to more than one tag"""
+        if not self.pattern_conflicts:
+            print("No conflicting patterns found.")
+            return self.pattern_conflicts
+        
+        print(f"{len(self.pattern_conflicts)} normalized patterns map to conflicting tags:")
+        for pattern, counts in sorted(self.pattern_conflicts.items()):
+            tags = ', '.join(f"{tag} ({count})" for tag, count in
+                             sorted(counts.items(), key=lambda item: -item[1]))
+            print(f"  '{pattern}': {tags}")
+        
+        return self.pattern_conflicts
+    
     def split_data(self, test_size=0.2, random_state=42):
-        """Split data into training and test sets"""
+        """Split data into training and test sets
+        
+        Splits are cached per (test_size, random_state), so repeated calls
+        return the same objects without re-running preprocessing.
+        """
         if self.df is None:
             self.create_training_data()
-            
-        X = self.df['text']
-        y = self.df['label']
         
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state, stratify=y
-        )
+        key = (test_size, random_state)
+        if key not in self.splits:
+            X = self.df['text']
+            y = self.df['label']
+            
+            self.splits[key] = train_test_split(
+                X, y, test_size=test_size, random_state=random_state, stratify=y
+            )
         
+        X_train, X_test, y_train, y_test = self.splits[key]
         return X_train, X_test, y_train, y_test
     
     def get_label_mapping(self):
@@ -117,4 +197,6 @@ if __name__ == "__main__":
     print(f"Test samples: {len(X_test)}")
     print(f"Number of classes: {len(preprocessor.label_encoder.classes_)}")
     print("Class distribution:")
-    print(preprocessor.get_class_distribution())
\ No newline at end of file
+    print(preprocessor.get_class_distribution())
+    print(f"Unique normalized patterns: {len(preprocessor.pattern_lookup)}")
+    preprocessor.report_pattern_conflicts()
\ No newline at end of file
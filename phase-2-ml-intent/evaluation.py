@@ -0,0 +1,174 @@
+"""
+Model Evaluation for Intent Classification
+Predicts once per model and derives every report from the cached results
+"""
+
+import os
+
+import numpy as np
+import matplotlib.pyplot as plt
+import seaborn as sns
+from sklearn.calibration import calibration_curve
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+
+
+def to_tags(labels, label_encoder=None):
+    """Return labels as intent tags, decoding them only if they are encoded"""
+    labels = np.asarray(labels)
+    if label_encoder is not None and np.issubdtype(labels.dtype, np.integer):
+        return label_encoder.inverse_transform(labels)
+    return labels
+
+
+class ModelEvaluator:
+    def __init__(self, X_test, y_test, label_encoder=None, output_dir=None):
+        """
+        label_encoder -- decodes integer labels back to tags, if they are encoded
+        output_dir    -- headless mode: figures are written here instead of shown
+        """
+        self.X_test = X_test
+        self.y_test = to_tags(y_test, label_encoder)
+        self.label_encoder = label_encoder
+        self.output_dir = output_dir
+        self.cache = {}
+
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+    def add_model(self, name, model):
+        """Predict the test set once and cache predictions and probabilities"""
+        # Vectorize once and share the matrix between predict and predict_proba
+        if hasattr(model, 'named_steps') and 'tfidf' in model.named_steps:
+            X = model.named_steps['tfidf'].transform(self.X_test)
+            classifier = model.named_steps['classifier']
+        else:
+            X, classifier = self.X_test, model
+
+        predictions = classifier.predict(X)
+        probabilities = None
+        if hasattr(classifier, 'predict_proba'):
+            probabilities = classifier.predict_proba(X)
+
+        return self.add_predictions(name, predictions, probabilities,
+                                    getattr(classifier, 'classes_', None))
+
+    def add_predictions(self, name, predictions, probabilities=None, classes=None):
+        """Cache results computed elsewhere"""
+        self.cache[name] = {
+            'predictions': np.asarray(predictions),
+            'probabilities': probabilities,
+            'classes': classes
+        }
+        return self.cache[name]
+
+    def get(self, name):
+        if name not in self.cache:
+            raise KeyError(f"No cached predictions for {name}. Call add_model first.")
+        return self.cache[name]
+
+    def predictions(self, name):
+        """Cached predictions decoded to intent tags"""
+        return to_tags(self.get(name)['predictions'], self.label_encoder)
+
+    def labels(self):
+        """Tags in a stable order for reports and confusion matrices"""
+        if self.label_encoder is not None and hasattr(self.label_encoder, 'classes_'):
+            return list(self.label_encoder.classes_)
+        return sorted(set(self.y_test))
+
+    def accuracy(self, name):
+        return accuracy_score(self.y_test, self.predictions(name))
+
+    def classification_report(self, name, output_dict=False):
+        return classification_report(self.y_test, self.predictions(name),
+                                     output_dict=output_dict, zero_division=0)
+
+    def confusion_matrix(self, name):
+        labels = self.labels()
+        return confusion_matrix(self.y_test, self.predictions(name), labels=labels), labels
+
+    def calibration(self, name, n_bins=10):
+        """Top-label calibration: confidence of the predicted class vs accuracy
+
+        Returns (mean_confidence, accuracy) per non-empty bin, or None for
+        models without probabilities.
+        """
+        cached = self.get(name)
+        probabilities = cached['probabilities']
+        if probabilities is None:
+            return None
+
+        classes = np.asarray(cached['classes'])
+        confidence = probabilities.max(axis=1)
+        top_class = to_tags(classes[probabilities.argmax(axis=1)], self.label_encoder)
+        correct = (top_class == self.y_test).astype(int)
+
+        accuracy, mean_confidence = calibration_curve(correct, confidence,
+                                                      n_bins=n_bins, strategy='uniform')
+        return mean_confidence, accuracy
+
+    def summary(self):
+        """Accuracy of every cached model"""
+        return {name: self.accuracy(name) for name in self.cache}
+
+    def _finish(self, filename):
+        """Show the current figure, or save it in headless mode"""
+        if self.output_dir:
+            path = os.path.join(self.output_dir, filename)
+            plt.savefig(path, bbox_inches='tight')
+            plt.close()
+            print(f"Figure saved to {path}")
+            return path
+        plt.show()
+        return None
+
+    def plot_confusion_matrix(self, name, figsize=(12, 10)):
+        cm, labels = self.confusion_matrix(name)
+
+        plt.figure(figsize=figsize)
+        sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
+                    xticklabels=labels, yticklabels=labels)
+        plt.title(f'Confusion Matrix ({name})')
+        plt.xlabel('Predicted')
+        plt.ylabel('Actual')
+        plt.xticks(rotation=45)
+        plt.yticks(rotation=0)
+        plt.tight_layout()
+        return self._finish(f'confusion_matrix_{name}.png')
+
+    def plot_calibration(self, names=None, n_bins=10, figsize=(8, 8)):
+        plt.figure(figsize=figsize)
+        plt.plot([0, 1], [0, 1], linestyle='--', color='gray', label='Perfectly calibrated')
+
+        for name in names or self.cache:
+            curve = self.calibration(name, n_bins)
+            if curve is not None:
+                plt.plot(curve[0], curve[1], marker='o', label=name)
+
+        plt.title('Calibration Curves')
+        plt.xlabel('Mean predicted confidence')
+        plt.ylabel('Accuracy')
+        plt.legend()
+        plt.tight_layout()
+        return self._finish('calibration_curves.png')
+
+
+# Example usage
+if __name__ == "__main__":
+    from data_preparation import IntentDataPreprocessor
+    from model_training import IntentClassifierTrainer
+
+    preprocessor = IntentDataPreprocessor('intents.json')
+    X_train, X_test, y_train, y_test = preprocessor.split_data()
+
+    trainer = IntentClassifierTrainer()
+    trainer.train_models(X_train, y_train)
+    trainer.evaluate_models(X_test, y_test, output_dir='figures')
+
+    # Every report below reuses the predictions cached by evaluate_models
+    evaluator = trainer.evaluator
+    for name in evaluator.cache:
+        print(f"\n{name}:")
+        print(evaluator.classification_report(name))
+        evaluator.plot_confusion_matrix(name)
+    evaluator.plot_calibration()
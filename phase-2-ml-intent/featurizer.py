@@ -0,0 +1,261 @@
+"""
+Sparse Featurizer for Intent Classification
+Turns normalizer tokens straight into TF-IDF CSR matrices
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfTransformer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+DEFAULT_TOKEN_PATTERN = r"(?u)\b\w\w+\b"
+
+
+class SparseFeaturizer:
+    """Drop-in replacement for the pipelines' TfidfVectorizer on preprocessed text
+
+    IntentDataPreprocessor already lowercases, keeps only letters and splits
+    on whitespace, so TfidfVectorizer's regex tokenization of the joined
+    string reduces to dropping single-letter tokens. This class applies that
+    rule, the vectorizer's stop words and n-grams directly to the token
+    lists and builds the CSR matrix itself. Its output is the same matrix
+    TfidfVectorizer produces on ' '.join(tokens).
+    """
+
+    def __init__(self, preprocessor=None, ngram_range=(1, 1), stop_words=None,
+                 min_df=1, max_df=1.0, max_features=None, binary=False,
+                 norm='l2', use_idf=True, smooth_idf=True, sublinear_tf=False):
+        self.preprocessor = preprocessor
+        self.ngram_range = ngram_range
+        self.stop_words = stop_words
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_features = max_features
+        self.binary = binary
+        self.norm = norm
+        self.use_idf = use_idf
+        self.smooth_idf = smooth_idf
+        self.sublinear_tf = sublinear_tf
+
+        self.stop_set = frozenset(TfidfVectorizer(stop_words=stop_words).get_stop_words() or ())
+        self.vocabulary_ = None
+        self.idf_ = None
+
+    @staticmethod
+    def supports(vectorizer):
+        """True if the vectorizer's tokenization matches what this class assumes"""
+        return (isinstance(vectorizer, TfidfVectorizer)
+                and vectorizer.analyzer == 'word'
+                and vectorizer.tokenizer is None
+                and vectorizer.preprocessor is None
+                and vectorizer.token_pattern == DEFAULT_TOKEN_PATTERN
+                and vectorizer.strip_accents is None
+                and vectorizer.vocabulary is None
+                and vectorizer.dtype == np.float64)
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer, preprocessor=None):
+        """Build from a TfidfVectorizer, reusing its fitted state if it has any"""
+        if not cls.supports(vectorizer):
+            raise ValueError("Only default word tokenization can be featurized from tokens")
+
+        featurizer = cls(
+            preprocessor=preprocessor,
+            ngram_range=vectorizer.ngram_range,
+            stop_words=vectorizer.stop_words,
+            min_df=vectorizer.min_df,
+            max_df=vectorizer.max_df,
+            max_features=vectorizer.max_features,
+            binary=vectorizer.binary,
+            norm=vectorizer.norm,
+            use_idf=vectorizer.use_idf,
+            smooth_idf=vectorizer.smooth_idf,
+            sublinear_tf=vectorizer.sublinear_tf
+        )
+        if hasattr(vectorizer, 'vocabulary_'):
+            featurizer.vocabulary_ = {term: int(index) for term, index
+                                      in vectorizer.vocabulary_.items()}
+            if vectorizer.use_idf:
+                featurizer.idf_ = vectorizer.idf_
+        return featurizer
+
+    def to_vectorizer(self):
+        """Equivalent fitted TfidfVectorizer, for pipelines and saved artifacts"""
+        vectorizer = TfidfVectorizer(
+            ngram_range=self.ngram_range,
+            stop_words=self.stop_words,
+            min_df=self.min_df,
+            max_df=self.max_df,
+            max_features=self.max_features,
+            binary=self.binary,
+            norm=self.norm,
+            use_idf=self.use_idf,
+            smooth_idf=self.smooth_idf,
+            sublinear_tf=self.sublinear_tf
+        )
+        vectorizer.vocabulary_ = dict(self.vocabulary_)
+        vectorizer.fixed_vocabulary_ = False
+        vectorizer._tfidf = TfidfTransformer(
+            norm=self.norm,
+            use_idf=self.use_idf,
+            smooth_idf=self.smooth_idf,
+            sublinear_tf=self.sublinear_tf
+        )
+        vectorizer._tfidf.n_features_in_ = len(self.vocabulary_)
+        if self.use_idf:
+            vectorizer._tfidf.idf_ = self.idf_
+        return vectorizer
+
+    def _tokens(self, doc):
+        """Token list for a preprocessed string or a token list"""
+        if isinstance(doc, str):
+            # Preprocessed strings are single-space joined tokens
+            return doc.split()
+        return doc
+
+    def analyze(self, tokens):
+        """Terms TfidfVectorizer would extract from ' '.join(tokens)"""
+        tokens = [token for token in tokens
+                  if len(token) > 1 and token not in self.stop_set]
+
+        min_n, max_n = self.ngram_range
+        if max_n == 1:
+            return tokens
+
+        terms = list(tokens) if min_n == 1 else []
+        n_tokens = len(tokens)
+        for n in range(max(min_n, 2), min(max_n, n_tokens) + 1):
+            for i in range(n_tokens - n + 1):
+                terms.append(' '.join(tokens[i:i + n]))
+        return terms
+
+    def _count(self, term_lists, vocabulary):
+        """CSR count matrix with sorted column indices per row"""
+        indices = []
+        data = []
+        indptr = [0]
+        for terms in term_lists:
+            counts = {}
+            for term in terms:
+                index = vocabulary.get(term)
+                if index is not None:
+                    counts[index] = counts.get(index, 0) + 1
+            for index in sorted(counts):
+                indices.append(index)
+                data.append(counts[index])
+            indptr.append(len(indices))
+
+        matrix = sp.csr_matrix(
+            (np.asarray(data, dtype=np.float64),
+             np.asarray(indices, dtype=np.int32),
+             np.asarray(indptr, dtype=np.int32)),
+            shape=(len(term_lists), len(vocabulary))
+        )
+        if self.binary:
+            matrix.data.fill(1)
+        return matrix
+
+    def _weight(self, counts):
+        """Apply sublinear tf, idf and normalization like TfidfTransformer"""
+        if self.sublinear_tf:
+            np.log(counts.data, counts.data)
+            counts.data += 1.0
+        if self.use_idf:
+            counts.data *= self.idf_[counts.indices]
+        if self.norm is not None:
+            counts = normalize(counts, norm=self.norm, copy=False)
+        return counts
+
+    def fit_transform(self, docs):
+        """Learn vocabulary and idf from token lists or preprocessed strings"""
+        term_lists = [self.analyze(self._tokens(doc)) for doc in docs]
+
+        # Alphabetical indices, as CountVectorizer assigns them
+        all_terms = sorted({term for terms in term_lists for term in terms})
+        counts = self._count(term_lists, {term: i for i, term in enumerate(all_terms)})
+
+        n_docs = counts.shape[0]
+        max_doc_count = self.max_df if isinstance(self.max_df, int) else self.max_df * n_docs
+        min_doc_count = self.min_df if isinstance(self.min_df, int) else self.min_df * n_docs
+        if max_doc_count < min_doc_count:
+            raise ValueError("max_df corresponds to < documents than min_df")
+
+        # Same pruning rules (and tie-breaking) as CountVectorizer._limit_features
+        dfs = np.bincount(counts.indices, minlength=counts.shape[1])
+        mask = (dfs <= max_doc_count) & (dfs >= min_doc_count)
+        if self.max_features is not None and mask.sum() > self.max_features:
+            tfs = np.asarray(counts.sum(axis=0)).ravel()
+            mask_inds = (-tfs[mask]).argsort()[:self.max_features]
+            new_mask = np.zeros(len(dfs), dtype=bool)
+            new_mask[np.where(mask)[0][mask_inds]] = True
+            mask = new_mask
+
+        kept = np.where(mask)[0]
+        if len(kept) == 0:
+            raise ValueError("After pruning, no terms remain. Try a lower min_df or a higher max_df.")
+        self.vocabulary_ = {all_terms[old]: new for new, old in enumerate(kept)}
+
+        if self.use_idf:
+            df = dfs[kept].astype(np.float64)
+            df += float(self.smooth_idf)
+            self.idf_ = np.full_like(df, fill_value=n_docs + int(self.smooth_idf))
+            self.idf_ /= df
+            np.log(self.idf_, out=self.idf_)
+            self.idf_ += 1.0
+
+        return self._weight(self._count(term_lists, self.vocabulary_))
+
+    def fit(self, docs):
+        self.fit_transform(docs)
+        return self
+
+    def transform(self, docs):
+        """TF-IDF matrix for token lists or preprocessed strings"""
+        if self.vocabulary_ is None:
+            raise ValueError("Featurizer is not fitted")
+        term_lists = [self.analyze(self._tokens(doc)) for doc in docs]
+        return self._weight(self._count(term_lists, self.vocabulary_))
+
+    def transform_raw(self, texts):
+        """TF-IDF matrix for raw messages, tokenized by the preprocessor"""
+        return self.transform([self.preprocessor.tokenize(text) for text in texts])
+
+
+def featurizer_for(model, preprocessor=None):
+    """SparseFeaturizer matching a fitted pipeline's 'tfidf' step, or None"""
+    steps = getattr(model, 'named_steps', {})
+    vectorizer = steps.get('tfidf')
+    if vectorizer is None or 'classifier' not in steps or not SparseFeaturizer.supports(vectorizer):
+        return None
+    return SparseFeaturizer.from_vectorizer(vectorizer, preprocessor)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+    from data_preparation import IntentDataPreprocessor
+
+    preprocessor = IntentDataPreprocessor('intents.json')
+    preprocessor.load_data()
+    raw = [pattern for intent in preprocessor.data['intents'] for pattern in intent['patterns']]
+
+    vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2),
+                                 stop_words='english', min_df=2, max_df=0.8)
+    featurizer = SparseFeaturizer.from_vectorizer(vectorizer, preprocessor)
+
+    start_time = time.perf_counter()
+    processed = [preprocessor.preprocess_text(text) for text in raw]
+    vectorizer.fit_transform(processed)
+    two_step_time = time.perf_counter() - start_time
+
+    preprocessor.stem.cache_clear()
+    start_time = time.perf_counter()
+    actual = featurizer.fit_transform([preprocessor.tokenize(text) for text in raw])
+    direct_time = time.perf_counter() - start_time
+
+    # TfidfVectorizer.fit_transform can differ from its own transform in the
+    # last bit (unsorted indices change the norm summation order), so compare
+    # against transform
+    expected = vectorizer.transform(processed)
+    print(f"Identical matrices: {(expected != actual).nnz == 0}")
+    print(f"Preprocess + TfidfVectorizer: {two_step_time:.2f}s | Tokens + featurizer: {direct_time:.2f}s")
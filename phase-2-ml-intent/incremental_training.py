@@ -0,0 +1,344 @@
+"""
+Incremental Retraining
+Hashes each intent, reuses cached rows and features for unchanged intents
+and updates count-based models in place
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.model_selection import train_test_split
+
+from featurizer import featurizer_for
+from reproducibility import derive_seed, fit_parallel
+
+
+def intent_hashes(intents):
+    """SHA-256 of each tag's patterns, in file order
+
+    Intents sharing a tag are hashed together, since they form one class.
+    """
+    patterns = {}
+    for intent in intents:
+        patterns.setdefault(intent['tag'], []).extend(intent['patterns'])
+    return {
+        tag: hashlib.sha256(json.dumps(tag_patterns, ensure_ascii=False).encode('utf-8')).hexdigest()
+        for tag, tag_patterns in patterns.items()
+    }, patterns
+
+
+class IntentDiff:
+    """Tags added, removed, changed and unchanged between two datasets"""
+
+    def __init__(self, old_hashes, new_hashes):
+        self.added = [tag for tag in new_hashes if tag not in old_hashes]
+        self.removed = [tag for tag in old_hashes if tag not in new_hashes]
+        self.changed = [tag for tag in new_hashes
+                        if tag in old_hashes and old_hashes[tag] != new_hashes[tag]]
+        self.unchanged = [tag for tag in new_hashes
+                          if tag in old_hashes and old_hashes[tag] == new_hashes[tag]]
+
+    @property
+    def dirty(self):
+        """Tags whose rows must be rebuilt"""
+        return self.added + self.changed
+
+    def has_changes(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return (f"IntentDiff(added={len(self.added)}, removed={len(self.removed)}, "
+                f"changed={len(self.changed)}, unchanged={len(self.unchanged)})")
+
+
+def update_count_statistics(classifier, class_features):
+    """Replace whole classes of a fitted count-based naive bayes in place
+
+    class_features maps tag -> feature matrix of all that class's rows, or
+    None to drop the class. MultinomialNB keeps per-class sums of the
+    feature rows (feature_count_) and row counts (class_count_), so a
+    class is updated from its own rows only and the log probabilities are
+    derived again, with the same result as a full fit on the same features.
+    """
+    classes = list(classifier.classes_)
+    feature_count = dict(zip(classes, classifier.feature_count_))
+    class_count = dict(zip(classes, classifier.class_count_))
+
+    for tag, X in class_features.items():
+        if X is None:
+            feature_count.pop(tag, None)
+            class_count.pop(tag, None)
+        else:
+            feature_count[tag] = np.asarray(X.sum(axis=0)).ravel()
+            class_count[tag] = X.shape[0]
+
+    # Classes stay sorted, as LabelBinarizer orders them in fit
+    new_classes = sorted(feature_count)
+    classifier.classes_ = np.array(new_classes)
+    classifier.feature_count_ = np.vstack([feature_count[tag] for tag in new_classes])
+    classifier.class_count_ = np.array([class_count[tag] for tag in new_classes], dtype=np.float64)
+
+    classifier._update_feature_log_prob(classifier._check_alpha())
+    classifier._update_class_log_prior(class_prior=classifier.class_prior)
+    return classifier
+
+
+def supports_count_update(classifier):
+    return all(hasattr(classifier, attr) for attr in
+               ('feature_count_', 'class_count_', '_update_feature_log_prob'))
+
+
+class IncrementalTrainer:
+    def __init__(self, preprocessor, trainer, cache_path=None, test_size=0.2,
+                 random_state=42, refresh_ratio=0.3):
+        """
+        preprocessor  -- IntentDataPreprocessor providing the dataset and normalizer
+        trainer       -- IntentClassifierTrainer whose models are kept up to date
+        cache_path    -- joblib file persisting rows, features and models between runs
+        refresh_ratio -- share of training rows rebuilt since the last full fit
+                         above which the vocabulary and idf are refitted too
+        """
+        self.preprocessor = preprocessor
+        self.trainer = trainer
+        self.cache_path = cache_path
+        self.test_size = test_size
+        self.random_state = random_state
+        self.refresh_ratio = refresh_ratio
+
+        self.hashes = {}
+        # tag -> {'train': [...], 'test': [...]} preprocessed patterns
+        self.rows = {}
+        # vectorizer key -> tag -> TF-IDF matrix of the tag's training rows
+        self.features = {}
+        self.rows_since_full = 0
+        self.history = []
+
+        if cache_path and os.path.exists(cache_path):
+            self.load_cache()
+
+    def config(self):
+        return {'test_size': self.test_size, 'random_state': self.random_state}
+
+    def load_cache(self):
+        cache = joblib.load(self.cache_path)
+        if cache['config'] != self.config():
+            print("Cached rows were split with other settings; starting from scratch.")
+            return
+        self.hashes = cache['hashes']
+        self.rows = cache['rows']
+        self.features = cache['features']
+        self.rows_since_full = cache['rows_since_full']
+        self.trainer.models = cache['models']
+        self.trainer.results = {
+            name: {'model': model, 'training_time': 0.0, 'memory': {}}
+            for name, model in cache['models'].items()
+        }
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        joblib.dump({
+            'config': self.config(),
+            'hashes': self.hashes,
+            'rows': self.rows,
+            'features': self.features,
+            'rows_since_full': self.rows_since_full,
+            'models': self.trainer.models
+        }, self.cache_path)
+
+    def _split_rows(self, tag, patterns):
+        """Split one tag's preprocessed patterns into train and test rows
+
+        Each tag is split on its own with a seed derived from its name, so
+        editing one intent never moves rows of another between the sets.
+        """
+        processed = [self.preprocessor.preprocess_text(pattern) for pattern in patterns]
+        if len(processed) < 2:
+            return {'train': processed, 'test': []}
+        train, test = train_test_split(
+            processed, test_size=self.test_size,
+            random_state=derive_seed(self.random_state, 'split', tag)
+        )
+        return {'train': train, 'test': test}
+
+    def prepare(self):
+        """Diff the dataset against the cache and preprocess only dirty tags"""
+        data = self.preprocessor.load_data()
+        new_hashes, patterns = intent_hashes(data['intents'])
+        diff = IntentDiff(self.hashes, new_hashes)
+
+        for tag in diff.removed:
+            del self.rows[tag]
+        for tag in diff.dirty:
+            self.rows[tag] = self._split_rows(tag, patterns[tag])
+        self.hashes = new_hashes
+
+        # Rows in file order, so a full fit sees the same data as a fresh run
+        self.rows = {tag: self.rows[tag] for tag in new_hashes}
+
+        all_patterns, all_labels = [], []
+        for tag, rows in self.rows.items():
+            all_patterns.extend(rows['train'] + rows['test'])
+            all_labels.extend([tag] * (len(rows['train']) + len(rows['test'])))
+        self.preprocessor.df = pd.DataFrame({'text': all_patterns, 'label': all_labels})
+        self.preprocessor.label_encoder.fit(all_labels)
+        self.preprocessor.splits = {}
+        self.preprocessor.build_pattern_lookup(all_patterns, all_labels)
+
+        return diff
+
+    def split(self):
+        """(X_train, X_test, y_train, y_test) assembled from the cached rows"""
+        X_train, X_test, y_train, y_test = [], [], [], []
+        for tag, rows in self.rows.items():
+            X_train.extend(rows['train'])
+            y_train.extend([tag] * len(rows['train']))
+            X_test.extend(rows['test'])
+            y_test.extend([tag] * len(rows['test']))
+        return X_train, X_test, y_train, y_test
+
+    def _vectorizer_key(self, model):
+        return repr(sorted(model.named_steps['tfidf'].get_params().items()))
+
+    def _featurize(self, tags):
+        """Compute the cached per-tag training features for the given tags"""
+        featurizers = {}
+        for model in self.trainer.models.values():
+            featurizers.setdefault(self._vectorizer_key(model), model)
+
+        for key, model in featurizers.items():
+            featurizer = featurizer_for(model, self.preprocessor)
+            vectorizer = featurizer or model.named_steps['tfidf']
+            tag_features = self.features.setdefault(key, {})
+            for tag in tags:
+                tag_features[tag] = vectorizer.transform(self.rows[tag]['train'])
+
+    def _stacked_features(self, key):
+        return sp.vstack([self.features[key][tag] for tag in self.rows], format='csr')
+
+    def train(self, force_full=False):
+        """Bring the models up to date with the dataset
+
+        A full fit refits vocabulary, idf and every classifier. Otherwise the
+        vocabulary is kept, only dirty tags are vectorized, count-based
+        models are updated per class and the rest are refitted on the cached
+        features without vectorizing again.
+        """
+        start_time = time.time()
+        diff = self.prepare()
+        X_train, _, y_train, _ = self.split()
+
+        dirty_rows = sum(len(self.rows[tag]['train']) for tag in diff.dirty)
+        full = (force_full or not self.trainer.results
+                or self.rows_since_full + dirty_rows > self.refresh_ratio * len(X_train))
+
+        if not diff.has_changes() and not full:
+            print("No intents changed; models are up to date.")
+            return diff
+
+        print(f"Dataset changes: {diff}")
+        if full:
+            self.full_fit(X_train, y_train)
+        else:
+            self.update(diff, y_train)
+            self.rows_since_full += dirty_rows
+
+        self.save_cache()
+        stats = {
+            'mode': 'full' if full else 'incremental',
+            'dirty_tags': len(diff.dirty),
+            'removed_tags': len(diff.removed),
+            'dirty_rows': dirty_rows,
+            'train_time': time.time() - start_time
+        }
+        self.history.append(stats)
+        print(f"{stats['mode'].capitalize()} retraining finished in {stats['train_time']:.2f} seconds")
+        return diff
+
+    def full_fit(self, X_train, y_train):
+        self.trainer.train_models(X_train, y_train)
+        for result in self.trainer.results.values():
+            result['update'] = 'full'
+
+        self.features = {}
+        self._featurize(list(self.rows))
+        self.rows_since_full = 0
+
+    def update(self, diff, y_train):
+        for key in self.features:
+            for tag in diff.removed:
+                self.features[key].pop(tag, None)
+        self._featurize(diff.dirty)
+
+        refit = {}
+        for name, model in self.trainer.models.items():
+            classifier = model.named_steps['classifier']
+            key = self._vectorizer_key(model)
+            stage = f'update:{name}'
+
+            if supports_count_update(classifier):
+                class_features = {tag: self.features[key][tag] for tag in diff.dirty}
+                class_features.update({tag: None for tag in diff.removed})
+                with self.trainer.profiler.stage(stage):
+                    update_count_statistics(classifier, class_features)
+                self._record(name, model, stage, 'incremental')
+            else:
+                refit[name] = key
+
+        if not refit:
+            return
+
+        features = {key: self._stacked_features(key) for key in set(refit.values())}
+        if self.trainer.n_jobs != 1:
+            classifiers = {name: self.trainer.models[name].named_steps['classifier'] for name in refit}
+            matrices = {name: features[key] for name, key in refit.items()}
+            with self.trainer.profiler.stage('update:parallel'):
+                fitted = fit_parallel(classifiers, matrices, y_train, self.trainer.n_jobs)
+            for name, (classifier, training_time) in fitted.items():
+                model = self.trainer.models[name]
+                model.steps[1] = ('classifier', classifier)
+                self._record(name, model, 'update:parallel', 'refit', training_time)
+            return
+
+        for name, key in refit.items():
+            model = self.trainer.models[name]
+            stage = f'update:{name}'
+            with self.trainer.profiler.stage(stage):
+                model.named_steps['classifier'].fit(features[key], y_train)
+            self._record(name, model, stage, 'refit')
+
+    def _record(self, name, model, stage, mode, training_time=None):
+        if training_time is None:
+            training_time = self.trainer.profiler.stages[stage]['time']
+        self.trainer.results[name] = {
+            'model': model,
+            'training_time': training_time,
+            'memory': {'fit': self.trainer.profiler.stages[stage]},
+            'update': mode
+        }
+        print(f"  {name} {mode} in {training_time:.3f} seconds")
+
+
+# Example usage
+if __name__ == "__main__":
+    from data_preparation import IntentDataPreprocessor
+    from model_training import IntentClassifierTrainer
+
+    preprocessor = IntentDataPreprocessor('intents.json')
+    trainer = IntentClassifierTrainer()
+    incremental = IncrementalTrainer(preprocessor, trainer, cache_path='incremental_cache.joblib')
+
+    # First run fits everything; after editing intents.json only the
+    # changed intents are preprocessed and vectorized again
+    incremental.train()
+    X_train, X_test, y_train, y_test = incremental.split()
+    trainer.evaluate_models(X_test, y_test)
+    trainer.get_best_model()
+    trainer.save_model('best_intent_classifier.joblib',
+                       pattern_lookup=preprocessor.pattern_lookup)
@@ -0,0 +1,200 @@
+"""
+Memory Profiling for the Training Pipeline
+Records tracemalloc snapshots and peak RSS for each training stage
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unavailable"""
+    if psutil is not None:
+        return psutil.Process(os.getpid()).memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """Process RSS high-water mark (VmHWM) in bytes on Linux, or None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class RssSampler:
+    """Polls RSS in a background thread to find the peak within one stage"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = current_rss()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.done.wait(self.interval):
+            rss = current_rss()
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+        rss = current_rss()
+        if rss is not None:
+            self.peak = max(self.peak or 0, rss)
+        return self.peak
+
+
+def to_mb(value):
+    return round(value / MB, 3) if value is not None else None
+
+
+class MemoryProfiler:
+    def __init__(self, enabled=True, top_n=5):
+        """
+        enabled -- trace Python allocations with tracemalloc; when False only
+                   wall-clock time and RSS are recorded
+        top_n   -- number of allocation sites kept from each snapshot diff
+        """
+        self.enabled = enabled
+        self.top_n = top_n
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        """Measure one pipeline stage
+
+        Each stage records wall-clock time, traced memory still held at the
+        end (delta), the traced peak while it ran, current RSS, the peak RSS
+        of this stage alone and the allocation sites that grew the most.
+        The stage peak comes from a background RSS sampler. On Linux, if the
+        process high-water mark (VmHWM) rose during the stage, the new mark
+        was set by this stage and is used too, catching spikes between
+        samples. The kernel counter itself is never reset, so getrusage and
+        /usr/bin/time still report the true process peak.
+        """
+        started_tracing = False
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+
+        before = None
+        if self.enabled:
+            tracemalloc.reset_peak()
+            before = tracemalloc.take_snapshot()
+            traced_before, _ = tracemalloc.get_traced_memory()
+
+        hwm_before = peak_rss()
+        sampler = RssSampler().start()
+
+        rss_before = current_rss()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start_time
+            stage_peak = sampler.stop()
+            hwm_after = peak_rss()
+            if hwm_before is not None and hwm_after is not None and hwm_after > hwm_before:
+                stage_peak = max(stage_peak or 0, hwm_after)
+
+            stats = {
+                'time': elapsed,
+                'rss_before_mb': to_mb(rss_before),
+                'rss_after_mb': to_mb(current_rss()),
+                'peak_rss_mb': to_mb(stage_peak)
+            }
+
+            if self.enabled:
+                traced_after, traced_peak = tracemalloc.get_traced_memory()
+                after = tracemalloc.take_snapshot()
+                stats['traced_delta_mb'] = to_mb(traced_after - traced_before)
+                stats['traced_peak_mb'] = to_mb(traced_peak)
+                stats['top_allocations'] = [
+                    {
+                        'location': str(diff.traceback),
+                        'size_diff_mb': to_mb(diff.size_diff)
+                    }
+                    for diff in after.compare_to(before, 'lineno')[:self.top_n]
+                ]
+                if started_tracing:
+                    tracemalloc.stop()
+
+            self.stages[name] = stats
+
+    def summary(self):
+        """Print one line per stage"""
+        print(f"\n{'STAGE':<32}{'TIME S':>9}{'TRACED PEAK MB':>16}{'PEAK RSS MB':>13}")
+        for name, stats in self.stages.items():
+            traced_peak = stats.get('traced_peak_mb')
+            traced_peak = f"{traced_peak:.1f}" if traced_peak is not None else '-'
+            rss = stats['peak_rss_mb']
+            rss = f"{rss:.1f}" if rss is not None else '-'
+            print(f"{name:<32}{stats['time']:>9.2f}{traced_peak:>16}{rss:>13}")
+
+    def save_report(self, filepath, extra=None):
+        """Write all stage measurements to a JSON file"""
+        report = {'stages': self.stages}
+        if extra:
+            report.update(extra)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Memory report saved to {filepath}")
+        return report
+
+
+def profile_training(data_path, report_path='training_memory_report.json'):
+    """Run the full training pipeline with every stage profiled"""
+    from data_preparation import IntentDataPreprocessor
+    from model_training import IntentClassifierTrainer
+
+    profiler = MemoryProfiler()
+    preprocessor = IntentDataPreprocessor(data_path)
+
+    with profiler.stage('load'):
+        preprocessor.load_data()
+    with profiler.stage('preprocess'):
+        preprocessor.create_training_data()
+    with profiler.stage('split'):
+        X_train, X_test, y_train, y_test = preprocessor.split_data()
+
+    trainer = IntentClassifierTrainer(profiler=profiler)
+    trainer.train_models(X_train, y_train)
+    trainer.evaluate_models(X_test, y_test)
+    trainer.get_best_model()
+
+    profiler.summary()
+    profiler.save_report(report_path, extra={
+        'n_samples': len(preprocessor.df),
+        'n_classes': len(preprocessor.label_encoder.classes_)
+    })
+    return trainer
+
+
+# Example usage
+if __name__ == "__main__":
+    profile_training('intents.json')
@@ -0,0 +1,263 @@
+"""
+Adaptive Micro-Batching
+Groups concurrent prediction requests into batches sized to meet a p99 latency target
+"""
+
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatchScheduler:
+    def __init__(self, predict_batch, p99_target_ms=50.0, max_batch_size=64,
+                 max_wait_ms=10.0, window=1000, adapt_every=50):
+        """
+        predict_batch  -- callable mapping a list of inputs to a list of results,
+                          e.g. MLChatbot.predict_intents
+        p99_target_ms  -- latency target (enqueue to result) for the 99th percentile
+        max_batch_size -- upper bound for the adaptive batch size
+        max_wait_ms    -- upper bound for how long a batch waits to fill up
+        window         -- recent requests used to estimate p99
+        adapt_every    -- completed requests between adjustments
+        """
+        self.predict_batch = predict_batch
+        self.p99_target = p99_target_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.adapt_every = adapt_every
+
+        # Start small: at low load a lone request should not wait for company
+        self.batch_size = 1
+        self.wait = 0.0
+
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = Counter()
+        self.queue_depths = Counter()
+        self.stats = {'requests': 0, 'batches': 0, 'errors': 0, 'max_queue_depth': 0}
+        self.since_adapt = 0
+        self.backlogged_batches = 0
+        self.adapt_batches = 0
+
+    def start(self):
+        if self.running:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Finish the queued requests, then stop the worker thread"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def submit(self, item):
+        """Queue one input; returns a Future resolving to its result"""
+        future = Future()
+        with self.condition:
+            if not self.running:
+                raise RuntimeError("Scheduler is not running. Call start() first.")
+            self.queue.append((item, future, time.perf_counter()))
+            depth = len(self.queue)
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], depth)
+            self.condition.notify()
+        return future
+
+    def predict(self, item, timeout=None):
+        """Blocking single-input prediction through the batcher"""
+        return self.submit(item).result(timeout)
+
+    def _next_batch(self):
+        """Wait for requests and take up to batch_size of them
+
+        The batch closes when it is full or when its oldest request has
+        waited self.wait seconds, whichever comes first.
+        """
+        with self.condition:
+            while not self.queue and self.running:
+                self.condition.wait()
+            if not self.queue:
+                return None
+
+            deadline = self.queue[0][2] + self.wait
+            while len(self.queue) < self.batch_size and self.running:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+
+            depth = len(self.queue)
+            self.queue_depths[depth] += 1
+            self.adapt_batches += 1
+            if depth > self.batch_size:
+                self.backlogged_batches += 1
+            size = min(self.batch_size, depth)
+            return [self.queue.popleft() for _ in range(size)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # A failing batch must never stop the worker, or every later
+            # submit() would wait forever
+            try:
+                self._process(batch)
+            except Exception as e:
+                self.stats['errors'] += len(batch)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _process(self, batch):
+        # Cancelled requests are dropped; the rest can no longer be cancelled
+        batch = [request for request in batch if request[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        items = [item for item, _, _ in batch]
+        try:
+            results = self.predict_batch(items)
+        except Exception as e:
+            self.stats['errors'] += len(batch)
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+        if len(results) != len(batch):
+            raise ValueError(f"predict_batch returned {len(results)} results for {len(batch)} inputs")
+
+        finished = time.perf_counter()
+        for (_, future, enqueued), result in zip(batch, results):
+            self.latencies.append(finished - enqueued)
+            future.set_result(result)
+
+        self.stats['requests'] += len(batch)
+        self.stats['batches'] += 1
+        self.batch_sizes[len(batch)] += 1
+        self.since_adapt += len(batch)
+        if self.since_adapt >= self.adapt_every:
+            self.since_adapt = 0
+            self._adapt()
+
+    def _adapt(self):
+        """Nudge batch size and wait time towards the p99 target
+
+        Over target, the cause decides the fix. If most batches left
+        requests behind in the queue, latency is queueing delay and larger
+        batches drain it faster; otherwise the batches themselves are too
+        slow, so the wait is halved and the batch shrinks. Well under target,
+        both grow step by step, which raises throughput at little cost to
+        latency.
+        """
+        p99 = np.percentile(self.latencies, 99)
+        backlogged = self.backlogged_batches * 2 >= self.adapt_batches
+        self.backlogged_batches = self.adapt_batches = 0
+
+        if p99 > self.p99_target:
+            self.wait /= 2
+            if backlogged:
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+            else:
+                self.batch_size = max(1, int(self.batch_size * 0.75))
+        elif p99 < self.p99_target / 2:
+            self.wait = min(self.max_wait, self.wait + self.max_wait / 10)
+            self.batch_size = min(self.max_batch_size, self.batch_size + max(1, self.batch_size // 4))
+
+    def latency_percentiles(self):
+        """Latency percentiles in milliseconds over the recent window"""
+        if not self.latencies:
+            return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0}
+        p50, p95, p99 = np.percentile(self.latencies, [50, 95, 99]) * 1000
+        return {'p50': p50, 'p95': p95, 'p99': p99}
+
+    def get_stats(self):
+        with self.condition:
+            queue_depth = len(self.queue)
+        batches = self.stats['batches']
+        return {
+            **self.stats,
+            'queue_depth': queue_depth,
+            'queue_depth_distribution': dict(sorted(self.queue_depths.items())),
+            'batch_size_distribution': dict(sorted(self.batch_sizes.items())),
+            'mean_batch_size': self.stats['requests'] / batches if batches else 0.0,
+            'batch_size': self.batch_size,
+            'wait_ms': self.wait * 1000,
+            'latency_ms': self.latency_percentiles()
+        }
+
+    def print_stats(self):
+        stats = self.get_stats()
+        latency = stats['latency_ms']
+        print(f"Requests: {stats['requests']} in {stats['batches']} batches "
+              f"(mean size {stats['mean_batch_size']:.1f}, errors {stats['errors']})")
+        print(f"Latency p50/p95/p99: {latency['p50']:.1f} / {latency['p95']:.1f} / "
+              f"{latency['p99']:.1f} ms (target {self.p99_target * 1000:.0f} ms)")
+        print(f"Current batch size: {stats['batch_size']}, wait: {stats['wait_ms']:.1f} ms, "
+              f"queue depth: {stats['queue_depth']} (max {stats['max_queue_depth']})")
+        print(f"Batch sizes: {stats['batch_size_distribution']}")
+
+
+def generate_load(scheduler, messages, rate, duration, seed=0):
+    """Submit messages at a Poisson arrival rate (requests/sec) for duration seconds
+
+    Waits for every request to finish and returns the scheduler's stats
+    together with the achieved throughput.
+    """
+    rng = random.Random(seed)
+    futures = []
+    start_time = time.perf_counter()
+    next_arrival = start_time
+    while next_arrival - start_time < duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        futures.append(scheduler.submit(rng.choice(messages)))
+        next_arrival += rng.expovariate(rate)
+
+    for future in futures:
+        future.result()
+    elapsed = time.perf_counter() - start_time
+
+    stats = scheduler.get_stats()
+    stats['offered_rate'] = rate
+    stats['throughput'] = len(futures) / elapsed
+    return stats
+
+
+# Example usage
+if __name__ == "__main__":
+    from ml_chatbot import MLChatbot
+
+    chatbot = MLChatbot(
+        intents_file='intents.json',
+        model_file='best_intent_classifier.joblib',
+        vectorizer_file='tfidf_vectorizer.joblib'
+    )
+    messages = ['hello there', 'what can you do', 'tell me about machine learning',
+                'how is the weather today', 'thanks a lot', 'goodbye']
+
+    for rate in [50, 500, 2000]:
+        print(f"\n{rate} requests/sec")
+        with MicroBatchScheduler(chatbot.predict_intents, p99_target_ms=25) as scheduler:
+            stats = generate_load(scheduler, messages, rate=rate, duration=5)
+        scheduler.print_stats()
+        print(f"Throughput: {stats['throughput']:.0f} requests/sec")
@@ -4,11 +4,15 @@ Main chatbot application using trained ML model
 """
 
 import json
+import os
 import random
 import joblib
 import numpy as np
 from data_preparation import IntentDataPreprocessor
 from model_training import IntentClassifierTrainer
+from evaluation import ModelEvaluator
+from featurizer import featurizer_for
+from serving import classify, load_artifact
 import re
 
 class MLChatbot:
@@ -26,11 +30,18 @@ class MLChatbot:
         self.model = None
         self.vectorizer = None
         self.label_encoder = None
+        self.pattern_lookup = {}
+        self.trainer = None
+        # (model, SparseFeaturizer) so the featurizer follows model swaps
+        self.featurizer_cache = (None, None)
         
         # Context tracking
         self.context = {}
         self.conversation_history = []
         
+        # Optional active_learning.TurnLog receiving uncertain turns
+        self.turn_log = None
+        
         # Load or train model
         if model_file and vectorizer_file:
             self.load_model(model_file, vectorizer_file)
@@ -45,6 +56,8 @@ class MLChatbot:
         X, y = self.preprocessor.create_training_data()
         X_train, X_test, y_train, y_test = self.preprocessor.split_data()
         self.label_encoder = self.preprocessor.label_encoder
+        self.pattern_lookup = self.preprocessor.pattern_lookup
+        self.preprocessor.report_pattern_conflicts()
         
         # Train models
         trainer = IntentClassifierTrainer()
@@ -52,6 +65,7 @@ class MLChatbot:
         trainer.evaluate_models(X_test, y_test)
         trainer.get_best_model()
         
+        self.trainer = trainer
         self.model = trainer.best_model
         self.vectorizer = self.model.named_steps['tfidf']
         
@@ -60,7 +74,9 @@ class MLChatbot:
     def load_model(self, model_file, vectorizer_file):
         """Load pre-trained model and vectorizer"""
         try:
-            self.model = joblib.load(model_file)
+            # Older artifacts hold only the model; the lookup table is rebuilt
+            self.model, self.pattern_lookup = load_artifact(model_file, self.intents,
+                                                            self.preprocessor)
             self.vectorizer = joblib.load(vectorizer_file)
             self.label_encoder = self.preprocessor.label_encoder
             print("Model loaded successfully!")
@@ -69,30 +85,47 @@ class MLChatbot:
             print("Training new model instead...")
             self.train_model()
     
+    def save_model(self, model_file):
+        """Save the model and lookup table as one artifact, replacing it atomically"""
+        temp_file = f"{model_file}.tmp"
+        joblib.dump({'model': self.model, 'pattern_lookup': self.pattern_lookup}, temp_file)
+        os.replace(temp_file, model_file)
+    
     def preprocess_input(self, text):
         """Preprocess user input using the same method as training"""
         return self.preprocessor.preprocess_text(text)
     
+    def get_featurizer(self):
+        """Featurizer for the current model's TF-IDF step, or None if unsupported"""
+        model, featurizer = self.featurizer_cache
+        if model is not self.model:
+            featurizer = featurizer_for(self.model, self.preprocessor)
+            self.featurizer_cache = (self.model, featurizer)
+        return featurizer
+    
     def predict_intent(self, user_input):
         """Predict intent from user input"""
+        return self.predict_intents([user_input])[0]
+    
+    def predict_intents(self, user_inputs):
+        """Predict intents for several messages with one classifier call
+        
+        Returns a list of (intent_tag, confidence, processed_input).
+        """
         if not self.model:
             raise ValueError("Model not loaded or trained")
         
         # Preprocess input
-        processed_input = self.preprocess_input(user_input)
-        
-        # Predict intent
-        prediction = self.model.predict([processed_input])[0]
-        confidence = np.max(self.model.predict_proba([processed_input]))
+        processed_inputs = [self.preprocess_input(user_input) for user_input in user_inputs]
         
-        # Convert back to intent tag
-        intent_tag = self.label_encoder.inverse_transform([prediction])[0]
-        
-        return intent_tag, confidence, processed_input
+        # Exact hits skip the classifier; the rest share one vectorization
+        results = classify(self.model, self.pattern_lookup, processed_inputs, self.get_featurizer())
+        return [(intent_tag, confidence, processed_input) for (intent_tag, confidence), processed_input
+                in zip(results, processed_inputs)]
     
-    def get_response(self, intent_tag, confidence_threshold=0.6):
+    def get_response(self, intent_tag, confidence=None, confidence_threshold=0.6):
         """Get response for predicted intent"""
-        if confidence_threshold and confidence < confidence_threshold:
+        if confidence is not None and confidence_threshold and confidence < confidence_threshold:
             return self.get_fallback_response()
         
         for intent in self.intents:
@@ -118,8 +151,16 @@ class MLChatbot:
         ]
         return random.choice(fallback_responses)
     
-    def update_context(self, user_input, intent_tag, response):
-        """Update conversation context"""
+    def update_context(self, user_input, intent_tag, response, confidence=None,
+                       processed_input=None):
+        """Update conversation context
+        
+        With a turn_log attached, low-confidence turns are also written to
+        disk before they drop out of the in-memory history.
+        """
+        if self.turn_log is not None and confidence is not None:
+            self.turn_log.record(user_input, intent_tag, confidence, processed_input)
+        
         self.conversation_history.append({
             'user_input': user_input,
             'intent': intent_tag,
@@ -151,10 +192,11 @@ class MLChatbot:
                 
                 # Predict intent and get response
                 intent_tag, confidence, processed_input = self.predict_intent(user_input)
-                response = self.get_response(intent_tag)
+                response = self.get_response(intent_tag, confidence)
                 
                 # Update context
-                self.update_context(user_input, intent_tag, response)
+                self.update_context(user_input, intent_tag, response,
+                                    confidence, processed_input)
                 
                 # Display response with confidence (for educational purposes)
                 print(f"Bot: {response}")
@@ -166,21 +208,35 @@ class MLChatbot:
             except Exception as e:
                 print(f"Bot: I encountered an error: {str(e)}")
                 print("Let's continue our conversation!")
+        
+        if self.turn_log is not None:
+            self.turn_log.close()
     
-    def evaluate_on_test_set(self):
-        """Evaluate model performance on test set"""
-        from sklearn.metrics import accuracy_score, classification_report
+    def evaluate_on_test_set(self, output_dir=None):
+        """Evaluate model performance on test set
         
+        Reuses the split and the predictions made during training when
+        available. With output_dir set, the confusion matrix is written
+        there as well.
+        """
         X_train, X_test, y_train, y_test = self.preprocessor.split_data()
-        y_pred = self.model.predict(X_test)
         
-        accuracy = accuracy_score(y_test, y_pred)
-        y_test_labels = self.label_encoder.inverse_transform(y_test)
-        y_pred_labels = self.label_encoder.inverse_transform(y_pred)
+        if self.trainer is not None and self.trainer.best_model is self.model:
+            evaluator = self.trainer.best_model_evaluator(X_test, y_test,
+                                                          self.label_encoder, output_dir)
+            name = self.trainer.best_model_name
+        else:
+            evaluator = ModelEvaluator(X_test, y_test, self.label_encoder, output_dir)
+            name = 'model'
+            evaluator.add_model(name, self.model)
         
+        accuracy = evaluator.accuracy(name)
         print(f"Model Accuracy: {accuracy:.4f}")
         print("\nClassification Report:")
-        print(classification_report(y_test_labels, y_pred_labels))
+        print(evaluator.classification_report(name))
+        
+        if output_dir:
+            evaluator.plot_confusion_matrix(name)
         
         return accuracy
 
@@ -0,0 +1,332 @@
+"""
+Model Compression for Intent Classification
+Prunes, strips and quantizes a trained pipeline into a smaller serving artifact
+"""
+
+import copy
+import io
+import time
+
+import joblib
+import numpy as np
+from scipy.special import expit, softmax
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score
+from sklearn.naive_bayes import MultinomialNB
+from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC
+
+
+class QuantizedLinearClassifier:
+    """Serving-only linear classifier with float16 or int8 weights
+
+    Scores are X @ weights.T * scales + intercept. Int8 weights carry one
+    scale per class; float16 weights use a scale of 1. The link turns
+    scores into probabilities the same way the source estimator did:
+    'softmax' for multinomial models and naive bayes, 'ovr' for one-vs-rest
+    logistic regression.
+
+    Weights are stored compactly; a float32 copy for the matrix product is
+    built once per process on first use and never pickled.
+    """
+
+    def __init__(self, weights, scales, intercept, classes, link='softmax'):
+        self.weights = weights
+        self.scales = scales
+        self.intercept = intercept
+        self.classes = classes
+        self.link = link
+        self.matmul_weights = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['matmul_weights'] = None
+        return state
+
+    @property
+    def classes_(self):
+        return self.classes
+
+    def decision_function(self, X):
+        if self.matmul_weights is None:
+            self.matmul_weights = np.ascontiguousarray(self.weights.T, dtype=np.float32)
+        scores = X @ self.matmul_weights
+        return np.asarray(scores) * self.scales + self.intercept
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        if self.link == 'ovr':
+            proba = expit(scores)
+            return proba / proba.sum(axis=1, keepdims=True)
+        return softmax(scores, axis=1)
+
+    def predict(self, X):
+        return self.classes[np.argmax(self.decision_function(X), axis=1)]
+
+
+class ServingPipeline:
+    """Predict-only stand-in for Pipeline around a QuantizedLinearClassifier
+
+    sklearn's Pipeline only accepts fittable estimators. This keeps the
+    steps / named_steps layout the serving code relies on.
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+
+    @property
+    def named_steps(self):
+        return dict(self.steps)
+
+    @property
+    def classes_(self):
+        return self.steps[-1][1].classes_
+
+    def transform_features(self, X):
+        for _, step in self.steps[:-1]:
+            X = step.transform(X)
+        return X
+
+    def decision_function(self, X):
+        return self.steps[-1][1].decision_function(self.transform_features(X))
+
+    def predict_proba(self, X):
+        return self.steps[-1][1].predict_proba(self.transform_features(X))
+
+    def predict(self, X):
+        return self.steps[-1][1].predict(self.transform_features(X))
+
+
+def quantize_weights(weights, dtype):
+    """Quantize a (n_classes, n_features) weight matrix
+
+    Returns (quantized_weights, per-class scales).
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if dtype == 'float16':
+        return weights.astype(np.float16), np.ones(weights.shape[0], dtype=np.float32)
+    if dtype == 'int8':
+        scales = np.abs(weights).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(weights / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"Unsupported quantization dtype: {dtype}")
+
+
+def artifact_size(obj):
+    """Size in bytes of an object once pickled with joblib"""
+    buffer = io.BytesIO()
+    joblib.dump(obj, buffer)
+    return buffer.getbuffer().nbytes
+
+
+class ModelCompressor:
+    def __init__(self, model, keep_ratio=0.5, quantize=None):
+        """
+        model      -- trained Pipeline with 'tfidf' and 'classifier' steps
+        keep_ratio -- share of vocabulary features to keep (1.0 disables pruning)
+        quantize   -- None, 'float16' or 'int8'
+        """
+        if quantize not in (None, 'float16', 'int8'):
+            raise ValueError(f"Unsupported quantization dtype: {quantize}")
+        self.model = model
+        self.keep_ratio = keep_ratio
+        self.quantize = quantize
+        self.compressed_model = None
+        self.notes = []
+
+    def feature_importance(self, classifier):
+        """Per-feature weight used to rank features for pruning
+
+        Linear models use the largest absolute coefficient over classes.
+        Naive bayes uses the spread of log probabilities over classes, since
+        a feature with the same log probability everywhere cannot change
+        the prediction.
+        """
+        if isinstance(classifier, MultinomialNB):
+            log_prob = classifier.feature_log_prob_
+            return log_prob.max(axis=0) - log_prob.min(axis=0)
+
+        if isinstance(classifier, LogisticRegression) or (
+                isinstance(classifier, SVC) and classifier.kernel == 'linear'):
+            coef = classifier.coef_
+            if hasattr(coef, 'toarray'):
+                coef = coef.toarray()
+            return np.abs(coef).max(axis=0)
+
+        return None
+
+    def prune_features(self, vectorizer, classifier):
+        """Drop the lowest-weight vocabulary features from both steps"""
+        importance = self.feature_importance(classifier)
+        if importance is None:
+            self.notes.append(f"pruning not supported for {type(classifier).__name__}")
+            return
+
+        n_keep = max(1, int(round(len(importance) * self.keep_ratio)))
+        if n_keep >= len(importance):
+            return
+
+        # Keep the original column order so idf_ and weights stay aligned
+        keep = np.sort(np.argsort(importance)[::-1][:n_keep])
+
+        index_map = {old: new for new, old in enumerate(keep)}
+        vectorizer.vocabulary_ = {
+            term: index_map[index]
+            for term, index in vectorizer.vocabulary_.items()
+            if index in index_map
+        }
+        vectorizer.idf_ = vectorizer.idf_[keep]
+        # The inner TfidfTransformer validates the column count it was fitted on
+        vectorizer._tfidf.n_features_in_ = n_keep
+
+        if isinstance(classifier, MultinomialNB):
+            classifier.feature_log_prob_ = classifier.feature_log_prob_[:, keep]
+            classifier.feature_count_ = classifier.feature_count_[:, keep]
+        elif isinstance(classifier, LogisticRegression):
+            classifier.coef_ = classifier.coef_[:, keep]
+        else:
+            classifier.support_vectors_ = classifier.support_vectors_[:, keep]
+        classifier.n_features_in_ = n_keep
+
+        self.notes.append(f"kept {n_keep} of {len(importance)} features")
+
+    def strip_vectorizer(self, vectorizer):
+        """Remove fit-time state that is not needed to transform text"""
+        # stop_words_ lists every term cut by min_df/max_df/max_features and
+        # is only kept for introspection
+        if hasattr(vectorizer, 'stop_words_'):
+            self.notes.append(f"dropped {len(vectorizer.stop_words_)} stop_words_ entries")
+            del vectorizer.stop_words_
+
+    def quantize_classifier(self, classifier):
+        """Swap the classifier for a QuantizedLinearClassifier when possible"""
+        if isinstance(classifier, MultinomialNB):
+            weights, link = classifier.feature_log_prob_, 'softmax'
+            intercept = classifier.class_log_prior_
+        elif isinstance(classifier, LogisticRegression):
+            weights, intercept = classifier.coef_, classifier.intercept_
+            link = 'ovr' if getattr(classifier, 'multi_class', None) == 'ovr' else 'softmax'
+            if len(classifier.classes_) == 2:
+                # Binary models keep one coefficient row for the positive class
+                weights = np.vstack([-weights, weights]) / 2
+                intercept = np.concatenate([-intercept, intercept]) / 2
+                link = 'softmax'
+        else:
+            self.notes.append(f"quantization not supported for {type(classifier).__name__}")
+            return classifier
+
+        quantized, scales = quantize_weights(weights, self.quantize)
+        self.notes.append(f"quantized weights to {self.quantize}")
+        return QuantizedLinearClassifier(
+            weights=quantized,
+            scales=scales,
+            intercept=np.asarray(intercept, dtype=np.float32),
+            classes=classifier.classes_,
+            link=link
+        )
+
+    def compress(self):
+        """Build the compressed pipeline, leaving the original model untouched"""
+        self.notes = []
+        vectorizer = copy.deepcopy(self.model.named_steps['tfidf'])
+        classifier = copy.deepcopy(self.model.named_steps['classifier'])
+
+        self.strip_vectorizer(vectorizer)
+        if self.keep_ratio < 1.0:
+            self.prune_features(vectorizer, classifier)
+        if self.quantize:
+            classifier = self.quantize_classifier(classifier)
+
+        steps = [('tfidf', vectorizer), ('classifier', classifier)]
+        if isinstance(classifier, QuantizedLinearClassifier):
+            self.compressed_model = ServingPipeline(steps)
+        else:
+            self.compressed_model = Pipeline(steps)
+
+        for note in self.notes:
+            print(f"  {note}")
+        return self.compressed_model
+
+    @staticmethod
+    def measure(model, X_test, y_test, n_single=200):
+        """Accuracy, pickled size and prediction latency of one model"""
+        # Warm up one-time setup (e.g. the quantized float32 weight view)
+        model.predict_proba(list(X_test[:1]))
+
+        start_time = time.perf_counter()
+        y_pred = model.predict(X_test)
+        batch_time = time.perf_counter() - start_time
+
+        samples = list(X_test[:n_single])
+        start_time = time.perf_counter()
+        for text in samples:
+            model.predict_proba([text])
+        single_time = time.perf_counter() - start_time
+
+        return {
+            'accuracy': accuracy_score(y_test, y_pred),
+            'size_bytes': artifact_size(model),
+            'batch_ms_per_message': batch_time / len(X_test) * 1000,
+            'single_ms': single_time / len(samples) * 1000
+        }
+
+    def evaluate(self, X_test, y_test):
+        """Compare original and compressed models on the test set"""
+        if self.compressed_model is None:
+            self.compress()
+
+        original = self.measure(self.model, X_test, y_test)
+        compressed = self.measure(self.compressed_model, X_test, y_test)
+        report = {
+            'original': original,
+            'compressed': compressed,
+            'accuracy_delta': compressed['accuracy'] - original['accuracy'],
+            'size_ratio': compressed['size_bytes'] / original['size_bytes'],
+            'notes': list(self.notes)
+        }
+
+        print(f"\n{'':<14}{'ACCURACY':>10}{'SIZE KB':>12}{'BATCH MS':>10}{'SINGLE MS':>11}")
+        for name, stats in [('original', original), ('compressed', compressed)]:
+            print(f"{name:<14}{stats['accuracy']:>10.4f}{stats['size_bytes'] / 1024:>12.1f}"
+                  f"{stats['batch_ms_per_message']:>10.4f}{stats['single_ms']:>11.3f}")
+        print(f"Accuracy delta: {report['accuracy_delta']:+.4f} | "
+              f"Size: {report['size_ratio']:.1%} of original")
+
+        return report
+
+    def save_model(self, filepath, pattern_lookup=None):
+        """Save the compressed model in the same format as IntentClassifierTrainer"""
+        if self.compressed_model is None:
+            self.compress()
+        if pattern_lookup is not None:
+            joblib.dump({'model': self.compressed_model,
+                         'pattern_lookup': pattern_lookup}, filepath)
+        else:
+            joblib.dump(self.compressed_model, filepath)
+        print(f"Compressed model saved to {filepath}")
+
+
+# Example usage
+if __name__ == "__main__":
+    from data_preparation import IntentDataPreprocessor
+    from model_training import IntentClassifierTrainer
+
+    preprocessor = IntentDataPreprocessor('intents.json')
+    X_train, X_test, y_train, y_test = preprocessor.split_data()
+
+    trainer = IntentClassifierTrainer()
+    trainer.train_models(X_train, y_train)
+    trainer.evaluate_models(X_test, y_test)
+    trainer.get_best_model()
+
+    # Compare every trained model under the same settings
+    for name, result in trainer.results.items():
+        print(f"\nCompressing {name}...")
+        compressor = ModelCompressor(result['model'], keep_ratio=0.3, quantize='int8')
+        compressor.compress()
+        compressor.evaluate(X_test, y_test)
+
+    compressor = ModelCompressor(trainer.best_model, keep_ratio=0.3, quantize='int8')
+    compressor.save_model('compressed_intent_classifier.joblib',
+                          pattern_lookup=preprocessor.pattern_lookup)
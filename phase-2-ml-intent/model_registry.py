@@ -0,0 +1,181 @@
+"""
+Multi-Tenant Model Registry
+Serves many intent models from one process with lazy loading and LRU eviction
+"""
+
+import json
+import os
+import random
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from data_preparation import IntentDataPreprocessor
+from featurizer import featurizer_for
+from serving import classify, load_artifact
+
+
+class TenantModel:
+    """Everything one tenant needs to answer: model, lookup table and responses"""
+
+    def __init__(self, model, pattern_lookup, responses, size_bytes):
+        self.model = model
+        self.featurizer = featurizer_for(model)
+        self.pattern_lookup = pattern_lookup
+        self.responses = responses
+        self.size_bytes = size_bytes
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget_mb=512):
+        """
+        memory_budget_mb -- upper bound on the summed artifact size of loaded
+                            tenants; the least recently used ones are evicted
+        """
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.tenants = {}
+        self.loaded = OrderedDict()
+        # tenant_id -> Future of a load in progress, so concurrent first
+        # requests share one load
+        self.loading = {}
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'loads': 0, 'evictions': 0}
+
+        # One normalizer (stemmer + stopword set) shared by every tenant
+        self.preprocessor = IntentDataPreprocessor(None)
+
+    def register(self, tenant_id, intents_file, model_file):
+        """Declare a tenant; nothing is loaded until its first request"""
+        self.tenants[tenant_id] = {
+            'intents_file': intents_file,
+            'model_file': model_file
+        }
+
+    def unregister(self, tenant_id):
+        """Forget a tenant and free its model"""
+        with self.lock:
+            self.tenants.pop(tenant_id, None)
+            self.loaded.pop(tenant_id, None)
+
+    def _load(self, tenant_id):
+        """Load a tenant's artifact and intents from disk"""
+        config = self.tenants[tenant_id]
+
+        with open(config['intents_file'], 'r', encoding='utf-8') as f:
+            intents = json.load(f)['intents']
+        responses = {intent['tag']: intent['responses'] for intent in intents}
+        # Responses are small next to the model, so they outlive eviction
+        config['responses'] = responses
+
+        # Older artifacts hold only the model; the lookup table is rebuilt
+        model, pattern_lookup = load_artifact(config['model_file'], intents, self.preprocessor)
+
+        # The artifact size on disk stands in for the in-memory footprint
+        size_bytes = os.path.getsize(config['model_file'])
+        return TenantModel(model, pattern_lookup, responses, size_bytes)
+
+    def _evict(self):
+        """Drop least recently used tenants until the budget is respected"""
+        while len(self.loaded) > 1 and self.memory_usage() > self.memory_budget:
+            tenant_id, _ = self.loaded.popitem(last=False)
+            self.stats['evictions'] += 1
+            print(f"Evicted tenant {tenant_id}")
+
+    def get(self, tenant_id):
+        """Return the loaded TenantModel, loading it on first use"""
+        if tenant_id not in self.tenants:
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+
+        with self.lock:
+            tenant = self.loaded.get(tenant_id)
+            if tenant is not None:
+                self.loaded.move_to_end(tenant_id)
+                return tenant
+
+            pending = self.loading.get(tenant_id)
+            owner = pending is None
+            if owner:
+                pending = self.loading[tenant_id] = Future()
+
+        if not owner:
+            return pending.result()
+
+        # Disk reads happen outside the lock so a cold tenant never stalls
+        # requests for tenants that are already loaded
+        try:
+            tenant = self._load(tenant_id)
+        except Exception as e:
+            with self.lock:
+                del self.loading[tenant_id]
+            pending.set_exception(e)
+            raise
+
+        with self.lock:
+            del self.loading[tenant_id]
+            self.stats['loads'] += 1
+            # Skip caching if the tenant was unregistered while loading
+            if tenant_id in self.tenants:
+                self.loaded[tenant_id] = tenant
+                self._evict()
+        pending.set_result(tenant)
+        return tenant
+
+    def predict_intent(self, tenant_id, user_input):
+        """Predict intent with the tenant's model
+
+        Returns (intent_tag, confidence, processed_input) like
+        MLChatbot.predict_intent.
+        """
+        with self.lock:
+            self.stats['requests'] += 1
+        tenant = self.get(tenant_id)
+        processed_input = self.preprocessor.preprocess_text(user_input)
+        intent_tag, confidence = classify(tenant.model, tenant.pattern_lookup,
+                                          [processed_input], tenant.featurizer)[0]
+        return intent_tag, confidence, processed_input
+
+    def get_response(self, tenant_id, intent_tag, confidence=None, confidence_threshold=0.6):
+        """Pick a response from the tenant's intents, or None below the threshold"""
+        if confidence is not None and confidence_threshold and confidence < confidence_threshold:
+            return None
+
+        # Cached at first load, so an evicted tenant is not reloaded for a string
+        config = self.tenants.get(tenant_id)
+        if config is None:
+            raise KeyError(f"Unknown tenant: {tenant_id}")
+        if 'responses' not in config:
+            self.get(tenant_id)
+        responses = config['responses'].get(intent_tag)
+        if responses:
+            return random.choice(responses)
+        return None
+
+    def memory_usage(self):
+        """Summed artifact size of the loaded tenants, in bytes"""
+        return sum(tenant.size_bytes for tenant in self.loaded.values())
+
+    def get_stats(self):
+        """Request, load and eviction counters plus the current residency"""
+        return {
+            **self.stats,
+            'registered': len(self.tenants),
+            'loaded': list(self.loaded.keys()),
+            'memory_usage_mb': self.memory_usage() / (1024 * 1024),
+            'memory_budget_mb': self.memory_budget / (1024 * 1024)
+        }
+
+
+# Example usage
+if __name__ == "__main__":
+    registry = ModelRegistry(memory_budget_mb=64)
+    registry.register('acme', 'intents.json', 'best_intent_classifier.joblib')
+    registry.register('globex', 'intents.json', 'compressed_intent_classifier.joblib')
+
+    for tenant_id, message in [('acme', 'hello there'),
+                               ('globex', 'tell me a joke'),
+                               ('acme', 'what is machine learning')]:
+        intent_tag, confidence, _ = registry.predict_intent(tenant_id, message)
+        response = registry.get_response(tenant_id, intent_tag, confidence)
+        print(f"[{tenant_id}] {message} -> {intent_tag} ({confidence:.2f}): {response}")
+
+    print(registry.get_stats())
@@ -11,19 +11,30 @@ from sklearn.svm import SVC
 from sklearn.linear_model import LogisticRegression
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.pipeline import Pipeline
-from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
 from sklearn.model_selection import cross_val_score, GridSearchCV
-import matplotlib.pyplot as plt
-import seaborn as sns
 import joblib
-import time
+from evaluation import ModelEvaluator
+from featurizer import SparseFeaturizer
+from memory_profiling import MemoryProfiler
+from reproducibility import derive_seed, seed_estimator, fit_parallel
 
 class IntentClassifierTrainer:
-    def __init__(self):
+    def __init__(self, profiler=None, seed=None, n_jobs=1):
+        """
+        profiler -- MemoryProfiler measuring each stage
+        seed     -- master seed; each model gets its own seed derived from it
+        n_jobs   -- fit models in parallel; results do not depend on it
+        """
         self.models = {}
         self.best_model = None
+        self.best_model_name = None
         self.vectorizer = None
         self.results = {}
+        self.evaluator = None
+        # Without an explicit profiler only time and RSS are recorded
+        self.profiler = profiler or MemoryProfiler(enabled=False)
+        self.seed = seed
+        self.n_jobs = n_jobs
         
     def create_pipelines(self):
         """Create ML pipelines with different algorithms"""
@@ -86,35 +97,118 @@ class IntentClassifierTrainer:
                 ))
             ])
         }
+        
+        # Per-model seeds keyed by name, so adding or reordering models
+        # never changes another model's seed
+        if self.seed is not None:
+            for name, model in self.models.items():
+                seed_estimator(model, derive_seed(self.seed, 'model', name))
+    
+    def vectorize(self, X_train):
+        """Fit the TF-IDF step of every pipeline on the training texts
+        
+        Pipelines with identical TF-IDF settings (all four by default) share
+        one SparseFeaturizer fit, and their 'tfidf' step is replaced by the
+        equivalent fitted TfidfVectorizer. Returns {name: (matrix, stage)}
+        where stage names the profiler stage that did the work.
+        """
+        features = {}
+        shared = {}
+        
+        for name, model in self.models.items():
+            vectorizer = model.named_steps['tfidf']
+            stage = f'vectorize:{name}'
+            
+            if not SparseFeaturizer.supports(vectorizer):
+                with self.profiler.stage(stage):
+                    features[name] = (vectorizer.fit_transform(X_train), stage)
+                continue
+            
+            key = repr(sorted(vectorizer.get_params().items()))
+            if key not in shared:
+                with self.profiler.stage(stage):
+                    featurizer = SparseFeaturizer.from_vectorizer(vectorizer)
+                    shared[key] = (featurizer, featurizer.fit_transform(X_train), stage)
+            
+            featurizer, X_train_tfidf, stage = shared[key]
+            model.steps[0] = ('tfidf', featurizer.to_vectorizer())
+            features[name] = (X_train_tfidf, stage)
+        
+        return features
     
     def train_models(self, X_train, y_train):
         """Train all models and measure training time"""
         self.create_pipelines()
         self.results = {}
         
+        features = self.vectorize(X_train)
+        
+        if self.n_jobs != 1:
+            self._train_models_parallel(features, y_train)
+            return
+        
         for name, model in self.models.items():
             print(f"Training {name}...")
-            start_time = time.time()
+            X_train_tfidf, vectorize_stage = features[name]
+            
+            with self.profiler.stage(f'fit:{name}'):
+                model.named_steps['classifier'].fit(X_train_tfidf, y_train)
             
-            model.fit(X_train, y_train)
+            # Shared vectorization is counted once, for the model that ran it
+            training_time = self.profiler.stages[f'fit:{name}']['time']
+            if vectorize_stage == f'vectorize:{name}':
+                training_time += self.profiler.stages[vectorize_stage]['time']
             
-            training_time = time.time() - start_time
             self.results[name] = {
                 'model': model,
-                'training_time': training_time
+                'training_time': training_time,
+                'memory': {
+                    'vectorize': self.profiler.stages[vectorize_stage],
+                    'fit': self.profiler.stages[f'fit:{name}']
+                }
             }
             
             print(f"  {name} trained in {training_time:.2f} seconds")
     
-    def evaluate_models(self, X_test, y_test):
-        """Evaluate all models on test data"""
+    def _train_models_parallel(self, features, y_train):
+        """Fit every classifier in its own worker process"""
+        print(f"Training {len(self.models)} models in parallel (n_jobs={self.n_jobs})...")
+        classifiers = {name: model.named_steps['classifier'] for name, model in self.models.items()}
+        matrices = {name: X_train_tfidf for name, (X_train_tfidf, _) in features.items()}
+        
+        with self.profiler.stage('train:parallel'):
+            fitted = fit_parallel(classifiers, matrices, y_train, self.n_jobs)
+        
+        for name, (classifier, training_time) in fitted.items():
+            model = self.models[name]
+            model.steps[1] = ('classifier', classifier)
+            # Worker processes are not profiled individually
+            self.results[name] = {
+                'model': model,
+                'training_time': training_time,
+                'memory': {'vectorize': self.profiler.stages[features[name][1]]}
+            }
+            print(f"  {name} trained in {training_time:.2f} seconds")
+    
+    def evaluate_models(self, X_test, y_test, label_encoder=None, output_dir=None):
+        """Evaluate all models on test data
+        
+        Predictions and probabilities are computed once per model and cached
+        in self.evaluator, which every later report reuses. With output_dir
+        set, figures are written there instead of shown.
+        """
+        self.evaluator = ModelEvaluator(X_test, y_test, label_encoder, output_dir)
+        
         for name in self.models.keys():
             model = self.results[name]['model']
-            y_pred = model.predict(X_test)
-            accuracy = accuracy_score(y_test, y_pred)
+            with self.profiler.stage(f'evaluate:{name}'):
+                cached = self.evaluator.add_model(name, model)
+            accuracy = self.evaluator.accuracy(name)
             
             self.results[name]['accuracy'] = accuracy
-            self.results[name]['predictions'] = y_pred
+            self.results[name]['predictions'] = cached['predictions']
+            self.results[name]['probabilities'] = cached['probabilities']
+            self.results[name]['memory']['evaluate'] = self.profiler.stages[f'evaluate:{name}']
             
             print(f"{name.upper():<20} Accuracy: {accuracy:.4f}")
     
@@ -130,56 +224,72 @@ class IntentClassifierTrainer:
         
         if best_model_name:
             self.best_model = self.results[best_model_name]['model']
+            self.best_model_name = best_model_name
             print(f"\nBest model: {best_model_name} with accuracy: {best_accuracy:.4f}")
             return self.best_model
         
         return None
     
+    def best_model_evaluator(self, X_test, y_test, label_encoder, output_dir=None):
+        """Evaluator for the best model that reuses evaluate_models' predictions"""
+        evaluator = ModelEvaluator(X_test, y_test, label_encoder, output_dir)
+        if self.evaluator is not None and self.evaluator.X_test is X_test \
+                and self.best_model_name in self.evaluator.cache:
+            evaluator.cache[self.best_model_name] = self.evaluator.cache[self.best_model_name]
+        else:
+            # Different data than evaluate_models saw: predict it once here
+            evaluator.add_model(self.best_model_name, self.best_model)
+        return evaluator
+    
     def detailed_classification_report(self, X_test, y_test, label_encoder):
         """Generate detailed classification report for best model"""
         if self.best_model:
-            y_pred = self.best_model.predict(X_test)
-            
-            # Convert encoded labels back to original names
-            y_test_labels = label_encoder.inverse_transform(y_test)
-            y_pred_labels = label_encoder.inverse_transform(y_pred)
+            evaluator = self.best_model_evaluator(X_test, y_test, label_encoder)
             
             print("\nDetailed Classification Report:")
-            print(classification_report(y_test_labels, y_pred_labels))
+            print(evaluator.classification_report(self.best_model_name))
             
-            return classification_report(y_test_labels, y_pred_labels, output_dict=True)
+            return evaluator.classification_report(self.best_model_name, output_dict=True)
         return None
     
-    def plot_confusion_matrix(self, X_test, y_test, label_encoder, figsize=(12, 10)):
-        """Plot confusion matrix for best model"""
+    def plot_confusion_matrix(self, X_test, y_test, label_encoder, figsize=(12, 10),
+                              output_dir=None):
+        """Plot confusion matrix for best model
+        
+        With output_dir set, the figure is saved there instead of shown.
+        """
         if self.best_model:
-            y_pred = self.best_model.predict(X_test)
-            y_test_labels = label_encoder.inverse_transform(y_test)
-            y_pred_labels = label_encoder.inverse_transform(y_pred)
-            
-            cm = confusion_matrix(y_test_labels, y_pred_labels, 
-                                labels=label_encoder.classes_)
-            
-            plt.figure(figsize=figsize)
-            sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                       xticklabels=label_encoder.classes_,
-                       yticklabels=label_encoder.classes_)
-            plt.title('Confusion Matrix')
-            plt.xlabel('Predicted')
-            plt.ylabel('Actual')
-            plt.xticks(rotation=45)
-            plt.yticks(rotation=0)
-            plt.tight_layout()
-            plt.show()
+            evaluator = self.best_model_evaluator(X_test, y_test, label_encoder, output_dir)
+            return evaluator.plot_confusion_matrix(self.best_model_name, figsize)
     
-    def save_model(self, filepath):
-        """Save the best model to disk"""
+    def save_model(self, filepath, pattern_lookup=None):
+        """Save the best model to disk
+        
+        When a pattern lookup table is given it is bundled with the model
+        as {'model': ..., 'pattern_lookup': ...} so both load together.
+        """
         if self.best_model:
-            joblib.dump(self.best_model, filepath)
+            if pattern_lookup is not None:
+                joblib.dump({'model': self.best_model,
+                             'pattern_lookup': pattern_lookup}, filepath)
+            else:
+                joblib.dump(self.best_model, filepath)
             print(f"Model saved to {filepath}")
         else:
             print("No model to save. Train a model first.")
     
+    def save_memory_report(self, filepath):
+        """Save per-stage memory measurements to a JSON file"""
+        return self.profiler.save_report(filepath, extra={
+            'models': {
+                name: {
+                    'training_time': result['training_time'],
+                    'accuracy': result.get('accuracy')
+                }
+                for name, result in self.results.items()
+            }
+        })
+    
     def save_vectorizer(self, filepath):
         """Save the TF-IDF vectorizer to disk"""
         if self.best_model:
@@ -194,6 +304,7 @@ if __name__ == "__main__":
     # Load and prepare data
     preprocessor = IntentDataPreprocessor('intents.json')
     X_train, X_test, y_train, y_test = preprocessor.split_data()
+    preprocessor.report_pattern_conflicts()
     
     # Train models
     trainer = IntentClassifierTrainer()
@@ -206,5 +317,6 @@ if __name__ == "__main__":
     trainer.plot_confusion_matrix(X_test, y_test, preprocessor.label_encoder)
     
     # Save the best model
-    trainer.save_model('best_intent_classifier.joblib')
+    trainer.save_model('best_intent_classifier.joblib',
+                       pattern_lookup=preprocessor.pattern_lookup)
     trainer.save_vectorizer('tfidf_vectorizer.joblib')
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""
+Reproducible Parallel Training
+Derives every seed from one master seed and merges parallel work in a fixed order
+"""
+
+import hashlib
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from joblib import Parallel, delayed
+from sklearn.base import clone
+
+
+def derive_seed(master_seed, *keys):
+    """Stable 32-bit seed for a (master_seed, keys...) combination
+
+    Uses SHA-256 rather than hash(), which is salted per process, so the
+    same keys give the same seed in every worker and every run.
+    """
+    material = repr((master_seed,) + keys).encode('utf-8')
+    return int.from_bytes(hashlib.sha256(material).digest()[:4], 'big')
+
+
+def seed_estimator(estimator, seed):
+    """Set every random_state parameter of an estimator or pipeline to seed"""
+    params = {
+        name: seed for name in estimator.get_params(deep=True)
+        if name == 'random_state' or name.endswith('__random_state')
+    }
+    if params:
+        estimator.set_params(**params)
+    return estimator
+
+
+def make_shards(items, shard_size, master_seed=None):
+    """Split items into fixed-size shards
+
+    Shard boundaries depend only on shard_size, never on the number of
+    workers, and each shard gets its own seed derived from master_seed.
+    Returns a list of (shard_id, shard_seed, items).
+    """
+    return [
+        (shard_id, derive_seed(master_seed, 'shard', shard_id),
+         items[start:start + shard_size])
+        for shard_id, start in enumerate(range(0, len(items), shard_size))
+    ]
+
+
+def merge_shards(results):
+    """Concatenate (shard_id, values) pairs in shard order, however they arrived"""
+    merged = []
+    for _, values in sorted(results, key=lambda result: result[0]):
+        merged.extend(values)
+    return merged
+
+
+def _preprocess_shard(shard_id, texts):
+    from data_preparation import IntentDataPreprocessor
+    preprocessor = IntentDataPreprocessor(None)
+    return shard_id, [preprocessor.preprocess_text(text) for text in texts]
+
+
+def preprocess_parallel(texts, n_jobs=-1, shard_size=2000):
+    """Preprocess texts across worker processes, returned in input order"""
+    shards = make_shards(list(texts), shard_size)
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_preprocess_shard)(shard_id, shard) for shard_id, _, shard in shards
+    )
+    return merge_shards(results)
+
+
+def _fit_one(name, model, X_train, y_train):
+    start_time = time.time()
+    model.fit(X_train, y_train)
+    return name, model, time.time() - start_time
+
+
+def fit_parallel(models, X_train, y_train, n_jobs=-1):
+    """Fit independent models in parallel
+
+    X_train is either shared by all models or a {name: X} dict.
+    Returns {name: (fitted_model, training_time)} in the order of models,
+    regardless of which worker finished first.
+    """
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_one)(name, clone(model),
+                          X_train[name] if isinstance(X_train, dict) else X_train,
+                          y_train)
+        for name, model in models.items()
+    )
+    fitted = {name: (model, training_time) for name, model, training_time in results}
+    return {name: fitted[name] for name in models}
+
+
+def _hash_state(digest, value):
+    if isinstance(value, np.ndarray):
+        digest.update(f'ndarray{value.dtype.str}{value.shape}'.encode())
+        if value.dtype == object:
+            for item in value.ravel():
+                _hash_state(digest, item)
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif sp.issparse(value):
+        value = value.tocsr()
+        digest.update(f'sparse{value.shape}'.encode())
+        for part in (value.data, value.indices, value.indptr):
+            _hash_state(digest, part)
+    elif isinstance(value, dict):
+        digest.update(b'dict')
+        for key in sorted(value, key=repr):
+            # Object ids (e.g. TfidfVectorizer._stop_words_id) differ per process
+            if isinstance(key, str) and key.endswith('_id'):
+                continue
+            digest.update(repr(key).encode())
+            _hash_state(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(type(value).__name__.encode())
+        for item in value:
+            _hash_state(digest, item)
+    elif isinstance(value, (str, bytes, int, float, bool, np.generic)) or value is None:
+        digest.update(repr(value).encode())
+    elif callable(value) and not hasattr(value, '__dict__'):
+        digest.update(getattr(value, '__qualname__', type(value).__name__).encode())
+    elif hasattr(value, '__dict__'):
+        digest.update(type(value).__qualname__.encode())
+        _hash_state(digest, vars(value))
+    else:
+        # Extension types such as sklearn's Tree expose their arrays via __getstate__
+        digest.update(type(value).__qualname__.encode())
+        _hash_state(digest, value.__getstate__())
+
+
+def fingerprint(model):
+    """SHA-256 over a fitted model's parameters and learned arrays
+
+    Two fingerprints match only if every learned value is bit-identical.
+    Pickles are not compared directly because they also capture process
+    details such as object ids and string sharing.
+    """
+    digest = hashlib.sha256()
+    _hash_state(digest, model)
+    return digest.hexdigest()
+
+
+# Example usage
+if __name__ == "__main__":
+    from data_preparation import IntentDataPreprocessor
+    from model_training import IntentClassifierTrainer
+
+    master_seed = 1234
+    fingerprints = {}
+    for n_jobs in [1, 4]:
+        preprocessor = IntentDataPreprocessor('intents.json')
+        preprocessor.create_training_data(n_jobs=n_jobs)
+        X_train, X_test, y_train, y_test = preprocessor.split_data(
+            random_state=derive_seed(master_seed, 'split')
+        )
+
+        trainer = IntentClassifierTrainer(seed=master_seed, n_jobs=n_jobs)
+        trainer.train_models(X_train, y_train)
+        fingerprints[n_jobs] = {
+            name: fingerprint(result['model']) for name, result in trainer.results.items()
+        }
+
+    for name in fingerprints[1]:
+        same = fingerprints[1][name] == fingerprints[4][name]
+        print(f"{name:<20} identical across n_jobs: {same}")
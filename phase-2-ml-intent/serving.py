@@ -0,0 +1,60 @@
+"""
+Serving Helpers
+Artifact loading and lookup-then-classify inference shared by every serving path
+"""
+
+import joblib
+import numpy as np
+from data_preparation import IntentDataPreprocessor, build_pattern_lookup
+
+
+def pattern_lookup_from_intents(intents, preprocessor):
+    """Exact-match table built from intents the same way training builds it"""
+    patterns, labels = [], []
+    for intent in intents:
+        for pattern in intent['patterns']:
+            patterns.append(preprocessor.preprocess_text(pattern))
+            labels.append(intent['tag'])
+    pattern_lookup, _ = build_pattern_lookup(patterns, labels)
+    return pattern_lookup
+
+
+def load_artifact(model_file, intents=None, preprocessor=None):
+    """Return (model, pattern_lookup) from a bundled or model-only artifact
+
+    Model-only artifacts predate the bundled lookup table; it is rebuilt
+    from intents when they are given and left empty otherwise.
+    """
+    artifact = joblib.load(model_file)
+    if isinstance(artifact, dict):
+        return artifact['model'], artifact.get('pattern_lookup', {})
+    if intents is None:
+        return artifact, {}
+    return artifact, pattern_lookup_from_intents(intents, preprocessor or IntentDataPreprocessor(None))
+
+
+def classify(model, pattern_lookup, processed_inputs, featurizer=None):
+    """Classify preprocessed texts, returning a list of (intent_tag, confidence)
+
+    Exact lookup hits are answered directly. The rest are vectorized once,
+    by the featurizer when there is one, and classified in a single call.
+    """
+    results = [pattern_lookup.get(text) for text in processed_inputs]
+    misses = [i for i, hit in enumerate(results) if hit is None]
+    if not misses:
+        return results
+
+    missed = [processed_inputs[i] for i in misses]
+    if featurizer is not None:
+        X = featurizer.transform(missed)
+        classifier = model.named_steps['classifier']
+    else:
+        X, classifier = missed, model
+
+    # Pipelines are fitted on tag strings (see split_data), so the
+    # predictions are already intent tags
+    predictions = classifier.predict(X)
+    confidences = np.max(classifier.predict_proba(X), axis=1)
+    for i, intent_tag, confidence in zip(misses, predictions, confidences):
+        results[i] = (intent_tag, confidence)
+    return results